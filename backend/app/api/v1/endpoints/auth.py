@@ -10,6 +10,7 @@ from app.api import deps
 from app.core import security
 from app.core.config import settings
 from app.db.session import get_db
+from app.core.session_cache import invalidate_cached_sessions
 
 router = APIRouter()
 
@@ -127,9 +128,11 @@ async def logout(
     """
     Logout user and invalidate all sessions
     """
+    sessions = await crud.user_session.get_active_sessions(db, user_id=current_user.id)
     await crud.user_session.invalidate_all_user_sessions(
         db, user_id=current_user.id
     )
+    await invalidate_cached_sessions(*(session.id for session in sessions))
     return {"message": "Successfully logged out"}
 
 
@@ -2,12 +2,15 @@
 User management endpoints.
 """
 from typing import Any, List, Optional
+from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
+from app.core.session_cache import invalidate_cached_sessions
 from app.crud.crud_user import user
+from app.crud.crud_user_session import user_session
 from app.db.models.user import User
 from app.exceptions.custom_exceptions import (
     EntityAlreadyExistsError,
@@ -95,7 +98,7 @@ async def read_user(
     *,
     db: AsyncSession = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user),
-    user_id: str,
+    user_id: UUID,
 ) -> Any:
     """
     Get user by ID.
@@ -123,7 +126,7 @@ async def update_user(
     *,
     db: AsyncSession = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user),
-    user_id: str,
+    user_id: UUID,
     user_in: UserUpdate,
 ) -> Any:
     """
@@ -159,7 +162,7 @@ async def delete_user(
     *,
     db: AsyncSession = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user),
-    user_id: str,
+    user_id: UUID,
 ) -> Any:
     """
     Delete user (soft delete).
@@ -185,8 +188,14 @@ async def delete_user(
         if target_user.company_id != current_user.company_id:
             raise InsufficientPermissionsError("Not enough permissions")
     
+    # Read the sessions first; deleting the user deletes them too
+    sessions = await user_session.get_active_sessions(db, user_id=user_id)
+    
     # Soft delete
     await user.remove(db=db, id=user_id)
+    
+    # Cached sessions would otherwise keep the user signed in until they expire
+    await invalidate_cached_sessions(*(session.id for session in sessions))
     return {"message": "User deleted successfully"}
 
 
@@ -195,7 +204,7 @@ async def activate_user(
     *,
     db: AsyncSession = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user),
-    user_id: str,
+    user_id: UUID,
 ) -> Any:
     """
     Activate user.
@@ -226,7 +235,7 @@ async def deactivate_user(
     *,
     db: AsyncSession = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user),
-    user_id: str,
+    user_id: UUID,
 ) -> Any:
     """
     Deactivate user.
@@ -256,6 +265,10 @@ async def deactivate_user(
         db_obj=target_user, 
         obj_in=UserUpdate(is_active=False)
     )
+    
+    # Cached sessions would otherwise keep the user signed in until they expire
+    sessions = await user_session.get_active_sessions(db, user_id=user_id)
+    await invalidate_cached_sessions(*(session.id for session in sessions))
     return updated_user
 
 
@@ -9,6 +9,7 @@ class Settings(BaseSettings):
     SECRET_KEY: str = secrets.token_urlsafe(32)
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
     REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    BCRYPT_ROUNDS: int = 12
     
     # Database PostgreSQL
     POSTGRES_SERVER: str = "localhost"
@@ -39,6 +40,8 @@ class Settings(BaseSettings):
     REDIS_PORT: int = 6379
     REDIS_PASSWORD: Optional[str] = None
     REDIS_DB: int = 0
+    REDIS_MAX_CONNECTIONS: int = 64
+    REDIS_POOL_TIMEOUT: float = 0.5
     
     @property
     def REDIS_URI(self) -> str:
@@ -64,6 +67,10 @@ class Settings(BaseSettings):
     SESSION_TIMEOUT_MINUTES: int = 30
     AUTO_RENEW_SESSION: bool = True
     
+    # Rate Limiting
+    RATE_LIMIT_BURST: int = 50
+    RATE_LIMIT_BURST_WINDOW: int = 60  # seconds
+    
     # Email (SMTP)
     SMTP_TLS: bool = True
     SMTP_PORT: Optional[int] = None
@@ -1,10 +1,14 @@
+import time
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Any, Union, Optional, Dict
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
 
 ALGORITHM = "HS256"
 
@@ -49,14 +53,27 @@ def create_refresh_token(
     return encoded_jwt
 
 
+@lru_cache(maxsize=10_000)
+def _decode_token_cached(token: str) -> Dict[str, Any]:
+    # Clients present the same token on many consecutive requests, so the
+    # signature check is done once per token and the result reused. Invalid
+    # tokens raise instead, which lru_cache never stores, so garbage tokens
+    # can't evict valid ones.
+    return jwt.decode(
+        token, settings.SECRET_KEY, algorithms=[ALGORITHM]
+    )
+
+
 def decode_access_token(token: str) -> Optional[Dict[str, Any]]:
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[ALGORITHM]
-        )
-        return payload
+        payload = _decode_token_cached(token)
     except JWTError:
         return None
+    # A cached payload may have expired since it was verified
+    exp = payload.get("exp")
+    if exp is not None and exp <= time.time():
+        return None
+    return dict(payload)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -0,0 +1,49 @@
+"""
+Redis cache of validated user sessions, shared by the session middleware and
+the auth endpoints.
+"""
+import time
+import logging
+from typing import Optional, Dict, Any
+import orjson
+from app.db.session import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Validated sessions are cached in Redis so repeat requests skip the database
+SESSION_CACHE_PREFIX = "sess:"
+SESSION_CACHE_TTL = 60  # seconds
+
+
+async def get_cached_session(session_id: str) -> Optional[Dict[str, Any]]:
+    """Read a session record from Redis, if cached."""
+    try:
+        redis = await get_redis()
+        cached = await redis.get(f"{SESSION_CACHE_PREFIX}{session_id}")
+        return orjson.loads(cached) if cached else None
+    except Exception as e:
+        logger.error(f"Error reading cached session: {e}")
+        return None
+
+
+async def cache_session(session_id: str, record: Dict[str, Any]) -> None:
+    """Cache a session record until it expires or the cache period ends."""
+    ttl = min(int(record["expires_at"] - time.time()), SESSION_CACHE_TTL)
+    if ttl <= 0:
+        return
+    try:
+        redis = await get_redis()
+        await redis.set(f"{SESSION_CACHE_PREFIX}{session_id}", orjson.dumps(record), ex=ttl)
+    except Exception as e:
+        logger.error(f"Error caching session: {e}")
+
+
+async def invalidate_cached_sessions(*session_ids) -> None:
+    """Drop cached session records, e.g. after logout or deactivation."""
+    if not session_ids:
+        return
+    try:
+        redis = await get_redis()
+        await redis.delete(*(f"{SESSION_CACHE_PREFIX}{session_id}" for session_id in session_ids))
+    except Exception as e:
+        logger.error(f"Error invalidating cached sessions: {e}")
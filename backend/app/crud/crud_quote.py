@@ -222,11 +222,16 @@ class CRUDQuote(CRUDBase[Quote, QuoteCreate, QuoteUpdate]):
         status_counts = dict(status_result.all())
 
         # Average response time (in days)
-        avg_response_stmt = select(
-            func.avg(
+        if db.get_bind().dialect.name == "postgresql":
+            response_days = (
                 func.extract('epoch', self.model.responded_at - self.model.sent_at) / 86400
             )
-        ).where(
+        else:
+            # No interval arithmetic elsewhere (e.g. SQLite); julianday already counts days
+            response_days = (
+                func.julianday(self.model.responded_at) - func.julianday(self.model.sent_at)
+            )
+        avg_response_stmt = select(func.avg(response_days)).where(
             and_(
                 self.model.company_id == company_id,
                 self.model.responded_at.is_not(None),
@@ -31,6 +31,21 @@ mongodb_database = None
 # Redis Configuration  
 redis_client: Optional[aioredis.Redis] = None
 
+def create_redis_pool() -> aioredis.BlockingConnectionPool:
+    """Create the bounded Redis connection pool shared by the app.
+
+    Callers wait up to REDIS_POOL_TIMEOUT for a free connection instead of
+    opening new ones during load bursts. Responses are parsed by hiredis
+    whenever it is installed.
+    """
+    return aioredis.BlockingConnectionPool.from_url(
+        settings.REDIS_URI,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+        encoding="utf-8",
+        decode_responses=True
+    )
+
 async def init_mongodb():
     """Initialize MongoDB connection"""
     global mongodb_client, mongodb_database
@@ -48,12 +63,7 @@ async def init_redis():
     """Initialize Redis connection"""
     global redis_client
     try:
-        redis_client = aioredis.from_url(
-            settings.REDIS_URI,
-            encoding="utf-8",
-            decode_responses=True,
-            max_connections=20
-        )
+        redis_client = aioredis.Redis(connection_pool=create_redis_pool())
         # Test connection
         await redis_client.ping()
         logger.info("Redis connected successfully")
@@ -124,11 +134,7 @@ redis_client: aioredis.Redis = None
 
 async def connect_to_redis():
     global redis_client
-    redis_client = aioredis.from_url(
-        settings.REDIS_URL,
-        encoding="utf-8",
-        decode_responses=True
-    )
+    redis_client = aioredis.Redis(connection_pool=create_redis_pool())
 
 
 async def close_redis_connection():
@@ -1,11 +1,17 @@
 """
 Rate limiting middleware using Redis for distributed rate limiting.
 """
+import re
+import math
 import time
+import hashlib
+import itertools
 import logging
-from typing import Optional, Dict, Tuple
+from typing import Optional, Any, Dict, List, Tuple
+from aioredis.exceptions import NoScriptError
+from redis.exceptions import NoScriptError as RedisNoScriptError
 from fastapi import Request, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from app.core.config import get_settings
 from app.db.session import get_redis
@@ -14,6 +20,50 @@ from app.core.security import decode_access_token
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Checks and counts every scope (IP, user, global) of a request in a single
+# atomic round-trip. KEYS holds one counter per scope and ARGV a
+# (limit, window_ms, shards) triple per key, where limit is per shard.
+# Nothing is counted unless every scope allows the request. Returns
+# {blocked, scope, count, ttl_ms} where scope is the 1-based index of the
+# blocking (or tightest) scope and count includes the current request. The
+# tightest scope is the one with the least quota left across all its shards.
+RATE_LIMIT_SCRIPT = """
+local counts = {}
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[3 * i - 2])
+    local count = tonumber(redis.call('GET', key) or '0') + 1
+    if count > limit then
+        return {1, i, count, redis.call('PTTL', key)}
+    end
+    counts[i] = count
+end
+local scope, best_remaining = 1, nil
+for i, key in ipairs(KEYS) do
+    redis.call('INCR', key)
+    if counts[i] == 1 then
+        redis.call('PEXPIRE', key, ARGV[3 * i - 1])
+    end
+    local remaining = (tonumber(ARGV[3 * i - 2]) - counts[i]) * tonumber(ARGV[3 * i])
+    if best_remaining == nil or remaining < best_remaining then
+        scope, best_remaining = i, remaining
+    end
+end
+return {0, scope, counts[scope], redis.call('PTTL', KEYS[scope])}
+"""
+RATE_LIMIT_SCRIPT_SHA = hashlib.sha1(RATE_LIMIT_SCRIPT.encode()).hexdigest()
+
+# aioredis raises its own NoScriptError, redis.asyncio clients redis-py's
+NO_SCRIPT_ERRORS = (NoScriptError, RedisNoScriptError)
+
+
+async def eval_script(redis, script: str, sha: str, keys: List[str], args: List) -> Any:
+    """Run a Lua script by SHA, loading it on first use."""
+    try:
+        return await redis.evalsha(sha, len(keys), *keys, *args)
+    except NO_SCRIPT_ERRORS:
+        # Script not cached on this Redis yet; EVAL loads it for next time
+        return await redis.eval(script, len(keys), *keys, *args)
+
 
 class RateLimitRule:
     """Rate limiting rule configuration."""
@@ -22,13 +72,37 @@ class RateLimitRule:
         self,
         requests: int,
         window: int,
-        per: str = "ip",  # ip, user, endpoint
-        burst: Optional[int] = None
+        per: str = "ip",  # ip, user, endpoint, global
+        burst: Optional[int] = None,
+        shards: int = 1
     ):
         self.requests = requests
         self.window = window  # in seconds
         self.per = per
         self.burst = burst or requests
+        
+        # Hot buckets are split into shards, each enforcing an equal share of
+        # the limit, so together they allow exactly the advertised total
+        self.shards = max(1, shards)
+        if requests % self.shards:
+            raise ValueError(f"requests ({requests}) must be a multiple of shards ({self.shards})")
+        self.shard_limit = requests // self.shards
+        self._shard_cycle = itertools.cycle(range(self.shards))
+        
+        # Headers that never change for this rule, formatted once
+        self.static_headers = {"X-RateLimit-Limit": str(requests)}
+    
+    def next_shard(self) -> int:
+        """Pick the shard for the next request, round-robin."""
+        return next(self._shard_cycle)
+    
+    def build_headers(self, remaining: int, reset_time: int) -> Dict[str, str]:
+        """Build the rate limit response headers for a request."""
+        return {
+            **self.static_headers,
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": str(reset_time),
+        }
 
 
 class RateLimitMiddleware(BaseHTTPMiddleware):
@@ -48,6 +122,11 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             "websocket": RateLimitRule(requests=5, window=60, per="ip"),  # 5 WS connections per minute
         }
         
+        # Caps shared by every client of a rule, checked alongside the IP/user scopes
+        self.global_rules = {
+            "auth": RateLimitRule(requests=480, window=60, per="global", shards=16),  # 480 auth attempts per minute overall
+        }
+        
         # Endpoint-specific rules
         self.endpoint_rules = {
             "/api/v1/auth/login": "auth",
@@ -65,37 +144,41 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             "/health",
             "/metrics"
         }
+        
+        # Exact hits are a set lookup; sub-paths fall back to one compiled prefix regex
+        self._exact_excluded = frozenset(self.excluded_paths)
+        self._excluded_prefix_re = re.compile(
+            "|".join(re.escape(path) for path in sorted(self.excluded_paths))
+        )
+    
+    def is_excluded_path(self, path: str) -> bool:
+        """Check whether a path bypasses rate limiting."""
+        return path in self._exact_excluded or self._excluded_prefix_re.match(path) is not None
     
     async def dispatch(self, request: Request, call_next):
         """Apply rate limiting to request."""
         
         # Skip rate limiting for excluded paths
-        if any(request.url.path.startswith(path) for path in self.excluded_paths):
+        if self.is_excluded_path(request.url.path):
             return await call_next(request)
         
         try:
-            # Determine which rule to apply
-            rule_name = self.get_rule_for_request(request)
-            rule = self.default_rules.get(rule_name, self.default_rules["global"])
-            
-            # Get rate limit key
-            limit_key = await self.get_rate_limit_key(request, rule)
+            # Collect every scope (IP, user, global) that applies to the request
+            scopes = await self.get_rate_limit_scopes(request)
             
-            # Check rate limit
-            allowed, remaining, reset_time = await self.check_rate_limit(limit_key, rule)
+            # Check all scopes at once and keep the most restrictive verdict
+            allowed, rule, remaining, reset_time = await self.check_rate_limits(scopes)
             
             if not allowed:
                 # Rate limit exceeded
-                return JSONResponse(
+                return ORJSONResponse(
                     status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                     content={
                         "detail": "Rate limit exceeded",
                         "retry_after": reset_time
                     },
                     headers={
-                        "X-RateLimit-Limit": str(rule.requests),
-                        "X-RateLimit-Remaining": str(remaining),
-                        "X-RateLimit-Reset": str(reset_time),
+                        **rule.build_headers(remaining, reset_time),
                         "Retry-After": str(reset_time)
                     }
                 )
@@ -104,9 +187,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             response = await call_next(request)
             
             # Add rate limit headers
-            response.headers["X-RateLimit-Limit"] = str(rule.requests)
-            response.headers["X-RateLimit-Remaining"] = str(remaining)
-            response.headers["X-RateLimit-Reset"] = str(reset_time)
+            response.headers.update(rule.build_headers(remaining, reset_time))
             
             return response
             
@@ -131,6 +212,28 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         # Default global rule
         return "global"
     
+    async def get_rate_limit_scopes(self, request: Request) -> List[Tuple[str, RateLimitRule]]:
+        """Build the (key, rule) pairs that must all allow the request."""
+        rule_name = self.get_rule_for_request(request)
+        rule = self.default_rules.get(rule_name, self.default_rules["global"])
+        
+        # IP scope: the endpoint rule itself when it is IP based, else the default
+        ip_rule = rule if rule.per == "ip" else self.default_rules["global"]
+        scopes = [(await self.get_rate_limit_key(request, ip_rule), ip_rule)]
+        
+        # User (or endpoint) scope on top of the IP scope
+        if rule.per != "ip":
+            key = await self.get_rate_limit_key(request, rule)
+            if key != scopes[0][0]:
+                scopes.append((key, rule))
+        
+        # Global scope shared by all clients
+        global_rule = self.global_rules.get(rule_name)
+        if global_rule:
+            scopes.append((await self.get_rate_limit_key(request, global_rule), global_rule))
+        
+        return scopes
+    
     async def get_rate_limit_key(self, request: Request, rule: RateLimitRule) -> str:
         """Generate rate limit key based on rule configuration."""
         base_key = "rate_limit"
@@ -153,6 +256,16 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             client_ip = self.get_client_ip(request)
             return f"{base_key}:endpoint:{endpoint}:ip:{client_ip}:{rule.window}"
         
+        elif rule.per == "global":
+            endpoint = request.url.path
+            key = f"{base_key}:global:{endpoint}:{rule.window}"
+            if rule.shards > 1:
+                # Spread requests over the shards so they don't contend on one
+                # key. Round-robin rather than by client, so every client can
+                # still use the whole global budget.
+                key = f"{key}:{rule.next_shard()}"
+            return key
+        
         else:
             # Default to IP
             client_ip = self.get_client_ip(request)
@@ -185,55 +298,41 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         # Fallback to client host
         return request.client.host if request.client else "unknown"
     
-    async def check_rate_limit(
+    async def check_rate_limits(
         self,
-        key: str,
-        rule: RateLimitRule
-    ) -> Tuple[bool, int, int]:
+        scopes: List[Tuple[str, RateLimitRule]]
+    ) -> Tuple[bool, RateLimitRule, int, int]:
         """
-        Check rate limit using sliding window algorithm.
-        Returns: (allowed, remaining_requests, reset_time)
+        Check and count all rate limit scopes with a single Lua call.
+        Returns: (allowed, deciding_rule, remaining_requests, reset_time)
         """
+        keys = [key for key, _ in scopes]
+        args = [
+            arg for _, rule in scopes
+            for arg in (rule.shard_limit, rule.window * 1000, rule.shards)
+        ]
+        
         try:
             redis = await get_redis()
-            current_time = int(time.time())
-            window_start = current_time - rule.window
-            
-            # Use sliding window with Redis sorted sets
-            pipe = redis.pipeline()
-            
-            # Remove old entries
-            pipe.zremrangebyscore(key, 0, window_start)
+            result = await eval_script(redis, RATE_LIMIT_SCRIPT, RATE_LIMIT_SCRIPT_SHA, keys, args)
             
-            # Count current requests
-            pipe.zcard(key)
+            # Lua integers come back as Redis integer replies, no parsing needed
+            blocked, scope, count, ttl_ms = result
+            rule = scopes[scope - 1][1]
             
-            # Add current request
-            pipe.zadd(key, {str(current_time): current_time})
+            # Calculate remaining and reset time for the deciding scope,
+            # scaling a shard's remaining quota up to the whole rule
+            remaining = max(0, rule.shard_limit - count) * rule.shards
+            ttl = math.ceil(ttl_ms / 1000) if ttl_ms > 0 else rule.window
+            reset_time = int(time.time()) + ttl
             
-            # Set expiration
-            pipe.expire(key, rule.window + 10)  # Extra time for cleanup
-            
-            results = await pipe.execute()
-            current_requests = results[1] + 1  # +1 for the current request
-            
-            # Calculate remaining and reset time
-            remaining = max(0, rule.requests - current_requests)
-            reset_time = current_time + rule.window
-            
-            # Check if limit exceeded
-            allowed = current_requests <= rule.requests
-            
-            if not allowed:
-                # Remove the current request since it's not allowed
-                await redis.zrem(key, str(current_time))
-            
-            return allowed, remaining, reset_time
+            return not blocked, rule, remaining, reset_time
             
         except Exception as e:
             logger.error(f"Error checking rate limit: {e}")
             # Allow request if Redis fails
-            return True, rule.requests, int(time.time()) + rule.window
+            rule = scopes[0][1]
+            return True, rule, rule.requests, int(time.time()) + rule.window
 
 
 class BurstRateLimitMiddleware(BaseHTTPMiddleware):
@@ -241,10 +340,20 @@ class BurstRateLimitMiddleware(BaseHTTPMiddleware):
     Burst rate limiting middleware for handling sudden spikes.
     """
     
-    def __init__(self, app, burst_limit: int = 50, burst_window: int = 60):
+    def __init__(self, app, burst_limit: Optional[int] = None, burst_window: Optional[int] = None):
         super().__init__(app)
-        self.burst_limit = burst_limit
-        self.burst_window = burst_window
+        self._burst_limit = burst_limit
+        self._burst_window = burst_window
+    
+    @property
+    def burst_limit(self) -> int:
+        """Requests allowed per burst window, falling back to settings."""
+        return self._burst_limit or settings.RATE_LIMIT_BURST
+    
+    @property
+    def burst_window(self) -> int:
+        """Burst window in seconds, falling back to settings."""
+        return self._burst_window or settings.RATE_LIMIT_BURST_WINDOW
     
     async def dispatch(self, request: Request, call_next):
         """Apply burst rate limiting."""
@@ -263,7 +372,7 @@ class BurstRateLimitMiddleware(BaseHTTPMiddleware):
                 await redis.expire(burst_key, self.burst_window)
             
             if current_burst > self.burst_limit:
-                return JSONResponse(
+                return ORJSONResponse(
                     status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                     content={
                         "detail": "Burst rate limit exceeded",
@@ -1,20 +1,35 @@
 """
 Session control middleware for managing user sessions and concurrent logins.
 """
+import re
+import time
 import logging
-from typing import Optional
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List
 from fastapi import Request, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from app.core.config import get_settings
 from app.core.security import decode_access_token
+from app.core.session_cache import cache_session, get_cached_session, invalidate_cached_sessions
 from app.crud.user_session import CRUDUserSession
-from app.db.session import get_db
+from app.db.session import get_db, get_redis
 from app.exceptions.custom_exceptions import AuthenticationError
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# last_activity is written at most once per interval per session
+ACTIVITY_GATE_PREFIX = "act:"
+ACTIVITY_UPDATE_INTERVAL = 60  # seconds
+
+
+def _to_timestamp(value: datetime) -> float:
+    """Convert a (possibly naive UTC) datetime to a POSIX timestamp."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
 
 class SessionControlMiddleware(BaseHTTPMiddleware):
     """
@@ -37,16 +52,26 @@ class SessionControlMiddleware(BaseHTTPMiddleware):
             "/health",
             "/metrics"
         }
+        
+        # Exact hits are a set lookup; sub-paths fall back to one compiled prefix regex
+        self._exact_excluded = frozenset(self.excluded_paths)
+        self._excluded_prefix_re = re.compile(
+            "|".join(re.escape(path) for path in sorted(self.excluded_paths))
+        )
+    
+    def is_excluded_path(self, path: str) -> bool:
+        """Check whether a path bypasses session validation."""
+        return path in self._exact_excluded or self._excluded_prefix_re.match(path) is not None
     
     async def dispatch(self, request: Request, call_next):
         """Process request and validate session."""
         
-        # Skip session validation for excluded paths
-        if any(request.url.path.startswith(path) for path in self.excluded_paths):
+        # CORS preflights never carry credentials worth checking
+        if request.method == "OPTIONS":
             return await call_next(request)
         
-        # Skip for OPTIONS requests
-        if request.method == "OPTIONS":
+        # Skip excluded paths
+        if self.is_excluded_path(request.url.path):
             return await call_next(request)
         
         try:
@@ -65,42 +90,40 @@ class SessionControlMiddleware(BaseHTTPMiddleware):
             if not user_id or not session_id:
                 return await call_next(request)
             
-            # Validate session in database
+            # Validate session, from the Redis cache when possible
             db = next(get_db())
-            session = await self.session_crud.get_active_session(db, session_id, user_id)
+            record = await get_cached_session(session_id)
+            if record is None:
+                record = await self.load_session(db, session_id, user_id)
             
-            if not session:
+            if not self.is_session_valid(record, user_id):
                 logger.warning(f"Invalid session {session_id} for user {user_id}")
-                return JSONResponse(
+                return ORJSONResponse(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     content={"detail": "Session expired or invalid"}
                 )
             
-            # Update session last activity
-            await self.session_crud.update_last_activity(db, session_id)
+            # Update session last activity (throttled)
+            await self.touch_session_activity(db, session_id)
             
             # Add session info to request state
             request.state.user_id = user_id
             request.state.session_id = session_id
             request.state.company_id = payload.get("company_id")
             
-            # Check for concurrent session limits
-            active_sessions = await self.session_crud.get_user_active_sessions(db, user_id)
-            if len(active_sessions) > self.max_sessions_per_user:
-                # Deactivate oldest sessions
-                await self.cleanup_excess_sessions(db, user_id, active_sessions)
-            
             response = await call_next(request)
             
             # Add session headers to response
             response.headers["X-Session-ID"] = session_id
-            response.headers["X-Session-Expires"] = session.expires_at.isoformat()
+            response.headers["X-Session-Expires"] = datetime.fromtimestamp(
+                record["expires_at"], tz=timezone.utc
+            ).isoformat()
             
             return response
             
         except AuthenticationError as e:
             logger.warning(f"Authentication error in session middleware: {e}")
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 content={"detail": str(e)}
             )
@@ -109,8 +132,63 @@ class SessionControlMiddleware(BaseHTTPMiddleware):
             # Continue with request if middleware fails
             return await call_next(request)
     
-    async def cleanup_excess_sessions(self, db, user_id: str, active_sessions):
-        """Remove excess sessions, keeping the most recent ones."""
+    async def load_session(self, db, session_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """Load a session from the database and cache it in Redis."""
+        session = await self.session_crud.get_active_session(db, session_id, user_id)
+        if not session:
+            return None
+        
+        record = {
+            "user_id": str(session.user_id),
+            "expires_at": _to_timestamp(session.expires_at),
+            "is_active": bool(session.is_active),
+        }
+        
+        # Check for concurrent session limits on every cache miss. A new
+        # session always misses on its first request, so the user's session
+        # count is checked whenever it grows.
+        active_sessions = await self.session_crud.get_user_active_sessions(db, user_id)
+        if len(active_sessions) > self.max_sessions_per_user:
+            # Deactivate oldest sessions
+            deactivated = await self.cleanup_excess_sessions(db, user_id, active_sessions)
+            if str(session_id) in deactivated:
+                # It was still valid when this request arrived; just don't cache it
+                return record
+        
+        await cache_session(session_id, record)
+        
+        return record
+    
+    def is_session_valid(self, record: Optional[Dict[str, Any]], user_id: str) -> bool:
+        """Check a session record is active, unexpired and owned by the user."""
+        return (
+            record is not None
+            and record["is_active"]
+            and record["user_id"] == str(user_id)
+            and record["expires_at"] > time.time()
+        )
+    
+    async def touch_session_activity(self, db, session_id: str) -> None:
+        """Update last_activity only when the per-session Redis gate is free."""
+        try:
+            redis = await get_redis()
+            acquired = await redis.set(
+                f"{ACTIVITY_GATE_PREFIX}{session_id}", "1", nx=True, ex=ACTIVITY_UPDATE_INTERVAL
+            )
+        except Exception as e:
+            logger.error(f"Error checking session activity gate: {e}")
+            # Fall back to updating on every request if Redis fails
+            acquired = True
+        
+        if acquired:
+            await self.session_crud.update_last_activity(db, session_id)
+    
+    async def cleanup_excess_sessions(self, db, user_id: str, active_sessions) -> List[str]:
+        """Remove excess sessions, keeping the most recent ones.
+        
+        Returns the ids of the deactivated sessions.
+        """
+        deactivated = []
         try:
             # Sort sessions by last activity (most recent first)
             sorted_sessions = sorted(
@@ -124,10 +202,15 @@ class SessionControlMiddleware(BaseHTTPMiddleware):
             
             for session in sessions_to_deactivate:
                 await self.session_crud.deactivate_session(db, session.id)
+                deactivated.append(str(session.id))
                 logger.info(f"Deactivated excess session {session.id} for user {user_id}")
                 
         except Exception as e:
             logger.error(f"Error cleaning up excess sessions: {e}")
+        
+        # Their cached records would otherwise keep them valid until expiry
+        await invalidate_cached_sessions(*deactivated)
+        return deactivated
 
 
 class DeviceTrackingMiddleware(BaseHTTPMiddleware):
@@ -142,6 +225,9 @@ class DeviceTrackingMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
         """Track device information for authenticated requests."""
         
+        if request.method == "OPTIONS":
+            return await call_next(request)
+        
         # Get device information from headers
         user_agent = request.headers.get("User-Agent", "")
         device_fingerprint = request.headers.get("X-Device-Fingerprint", "")
@@ -130,7 +130,7 @@ def create_application() -> FastAPI:
     app.add_middleware(SessionControlMiddleware, max_sessions_per_user=5)
     
     # Add rate limiting middleware
-    app.add_middleware(BurstRateLimitMiddleware, burst_limit=50, burst_window=60)
+    app.add_middleware(BurstRateLimitMiddleware)
     app.add_middleware(RateLimitMiddleware)
     
     # Add compression middleware
@@ -6,6 +6,7 @@ import sys
 import pytest
 import asyncio
 from pathlib import Path
+from types import MappingProxyType
 from typing import Generator, AsyncGenerator
 from unittest.mock import Mock
 
@@ -17,6 +18,8 @@ sys.path.insert(0, str(PROJECT_ROOT))
 os.environ["TESTING"] = "true"
 os.environ["LOG_LEVEL"] = "INFO"
 os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+# Cheapest bcrypt cost; read when app.core.security builds its hasher
+os.environ["BCRYPT_ROUNDS"] = "4"
 
 # Configure pytest markers
 def pytest_configure(config):
@@ -81,4 +84,66 @@ def test_client():
         # Return mock client if FastAPI is not available
         return Mock()
 
+# Read-only templates; each factory call merges its overrides into a new dict
+_COMPANY_TEMPLATE = MappingProxyType({
+    "name": "Test Company",
+    "cnpj": "12345678000199",
+    "email": "test@company.com",
+    "phone": "11999999999",
+    "address": "Test Address, 123",
+    "city": "Test City",
+    "state": "SP",
+    "zip_code": "12345-678"
+})
+
+_USER_TEMPLATE = MappingProxyType({
+    "email": "test@example.com",
+    "password": "testpassword",
+    "full_name": "Test User",
+    "role": "user"
+})
+
+_TENDER_TEMPLATE = MappingProxyType({
+    "title": "Test Tender",
+    "description": "Test tender description",
+    "submission_deadline": "2024-12-31T23:59:59",
+    "status": "open",
+    "budget": 100000.0
+})
+
+_SUPPLIER_TEMPLATE = MappingProxyType({
+    "name": "Test Supplier",
+    "cnpj": "98765432000199",
+    "email": "supplier@test.com",
+    "phone": "11888888888",
+    "address": "Supplier Address, 456",
+    "city": "Supplier City",
+    "state": "RJ",
+    "zip_code": "87654-321"
+})
+
+
+class TestDataFactory:
+    """Factory for creating test data."""
+    
+    @staticmethod
+    def company_create_data(overrides: dict = None) -> dict:
+        """Create company creation data."""
+        return {**_COMPANY_TEMPLATE, **(overrides or {})}
+    
+    @staticmethod
+    def user_create_data(overrides: dict = None) -> dict:
+        """Create user creation data."""
+        return {**_USER_TEMPLATE, **(overrides or {})}
+    
+    @staticmethod
+    def tender_create_data(overrides: dict = None) -> dict:
+        """Create tender creation data."""
+        return {**_TENDER_TEMPLATE, **(overrides or {})}
+    
+    @staticmethod
+    def supplier_create_data(overrides: dict = None) -> dict:
+        """Create supplier creation data."""
+        return {**_SUPPLIER_TEMPLATE, **(overrides or {})}
+
 # Pytest plugins are auto-discovered, no need to declare them explicitly
\ No newline at end of file
@@ -0,0 +1,571 @@
+"""
+Integration test fixtures.
+"""
+import os
+import uuid
+import httpx
+import pytest
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from unittest.mock import AsyncMock, patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import INET
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.pool import StaticPool
+
+import fakeredis.aioredis
+
+# One in-memory database per test process, shared by every connection in
+# it; each xdist worker therefore gets its own isolated database
+TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+
+@compiles(INET, "sqlite")
+def _compile_inet_sqlite(type_, compiler, **kw):
+    """Store Postgres INET columns as text on the SQLite test database."""
+    return "VARCHAR(45)"
+
+
+# bcrypt hash of "testpassword" at cost 4, so seeding the test user
+# does not pay for a full-cost hash on every session or xdist worker
+TEST_USER_PASSWORD_HASH = "$2b$04$5yCUe0JvZqSmiwU/HJI2BuGqpXPs2weA5mOh502G.bv2Cm5dRoCke"
+
+# Fixed primary key of the seeded company admin, so its token can be signed
+# without reading the row back
+ADMIN_USER_ID = uuid.UUID("00000000-0000-4000-8000-00000000ad01")
+
+# Settings overrides the integration app is built with
+TEST_APP_CONFIG = {"DEBUG": True, "ENVIRONMENT": "testing"}
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    """Run async fixtures and tests on one asyncio loop for the whole session."""
+    return "asyncio"
+
+
+# Prefix marking hashes made by the stubbed hasher below
+_PLAIN_HASH_PREFIX = "$plain$"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def plain_password_hasher():
+    """Swap bcrypt for a plain-text stand-in while integration tests run.
+
+    Login checks still compare passwords, just without the hashing cost.
+    Hashes that are not stand-ins, such as TEST_USER_PASSWORD_HASH, still
+    go through bcrypt. Only active under TESTING, so it cannot leak into a
+    real process.
+    """
+    if os.environ.get("TESTING") != "true":
+        yield
+        return
+
+    from app.core.security import pwd_context
+
+    real_verify = pwd_context.verify
+
+    def verify(secret, hash, **kwargs):
+        if hash and hash.startswith(_PLAIN_HASH_PREFIX):
+            return hash == _PLAIN_HASH_PREFIX + secret
+        return real_verify(secret, hash, **kwargs)
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(pwd_context, "hash", lambda secret, **kwargs: _PLAIN_HASH_PREFIX + secret)
+        mp.setattr(pwd_context, "verify", verify)
+        yield
+
+
+@pytest.fixture(scope="session")
+async def engine(anyio_backend):
+    """Test database engine.
+
+    One engine for the session, so its compiled statement cache is shared
+    by every fixture and request. Statement logging stays off even though
+    the app runs with DEBUG=True.
+
+    pysqlite begins transactions lazily and manages SAVEPOINTs itself, so a
+    commit inside db_session would really commit. The listeners hand
+    transaction control back to SQLAlchemy, as its SQLite docs recommend.
+    """
+    engine = create_async_engine(
+        TEST_DATABASE_URL,
+        echo=False,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def disable_driver_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture(scope="session")
+async def schema(engine):
+    """Create the schema once per session; tests isolate through rollbacks only."""
+    from app.db.base_class import Base
+    import app.db.models  # noqa: F401 - registers the tables on Base.metadata
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+
+
+@pytest.fixture(scope="session")
+def session_factory(engine, schema):
+    """Session factory bound to the test engine."""
+    return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@lru_cache(maxsize=None)
+def _build_app(frozen_config: frozenset) -> FastAPI:
+    """Build the application, without docs, once per settings override."""
+    from app.core.config import settings
+    from main import create_application
+
+    for key, value in frozen_config:
+        setattr(settings, key, value)
+    app = create_application()
+
+    # DEBUG turns the docs on, but no test reads them; drop the routes and
+    # never build the schema.
+    docs_paths = {
+        app.openapi_url,
+        app.docs_url,
+        app.swagger_ui_oauth2_redirect_url,
+        app.redoc_url,
+    }
+    app.router.routes = [
+        route for route in app.router.routes
+        if getattr(route, "path", None) not in docs_paths
+    ]
+    app.openapi_url = app.docs_url = app.redoc_url = None
+    app.openapi = lambda: {}
+    return app
+
+
+@pytest.fixture(scope="session")
+def app(session_factory):
+    """The application under test, backed by the in-memory database."""
+    from app.db.session import get_db
+
+    app = _build_app(frozenset(TEST_APP_CONFIG.items()))
+
+    async def override_get_db():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield app
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+async def db_session(app, engine, schema):
+    """Database session whose work is rolled back after the test.
+
+    The session joins an outer transaction and turns its own commits into
+    SAVEPOINT releases, so rows created by fixtures or requests never need
+    deleting. The app's get_db hands out the same session meanwhile. The
+    company and user behind auth_headers live outside it, for the session.
+    """
+    from app.db.session import get_db
+
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        session = AsyncSession(
+            bind=conn,
+            expire_on_commit=False,
+            join_transaction_mode="create_savepoint"
+        )
+
+        async def override_get_db():
+            yield session
+
+        default_get_db = app.dependency_overrides[get_db]
+        app.dependency_overrides[get_db] = override_get_db
+        try:
+            yield session
+        finally:
+            app.dependency_overrides[get_db] = default_get_db
+            await session.close()
+            await transaction.rollback()
+
+
+@pytest.fixture(scope="session")
+async def test_company(session_factory):
+    """Create the test company shared by the whole session."""
+    from app.db.models import Company, CompanyStatus
+
+    company = Company(
+        name="Test Company",
+        cnpj="12345678000199",
+        email="test@company.com",
+        phone="11999999999",
+        address_city="Test City",
+        address_state="SP",
+        address_zip_code="12345-678",
+        status=CompanyStatus.ACTIVE
+    )
+    async with session_factory() as session:
+        session.add(company)
+        await session.commit()
+        await session.refresh(company)
+    return company
+
+
+@pytest.fixture(scope="session")
+async def test_user(session_factory, test_company):
+    """Create the test user shared by the whole session."""
+    from app.db.models import User, UserRole, UserStatus
+
+    user = User(
+        company_id=test_company.id,
+        email="test@example.com",
+        password_hash=TEST_USER_PASSWORD_HASH,
+        first_name="Test",
+        last_name="User",
+        role=UserRole.USER,
+        status=UserStatus.ACTIVE,
+        is_active=True
+    )
+    async with session_factory() as session:
+        session.add(user)
+        await session.commit()
+        await session.refresh(user)
+    return user
+
+
+@pytest.fixture(scope="session")
+async def admin_user(session_factory, test_company):
+    """Create the company admin shared by the whole session."""
+    from app.db.models import User, UserRole, UserStatus
+
+    user = User(
+        id=ADMIN_USER_ID,
+        company_id=test_company.id,
+        email="admin@example.com",
+        password_hash=TEST_USER_PASSWORD_HASH,
+        first_name="Admin",
+        last_name="User",
+        role=UserRole.ADMIN,
+        status=UserStatus.ACTIVE,
+        is_active=True
+    )
+    async with session_factory() as session:
+        session.add(user)
+        await session.commit()
+        await session.refresh(user)
+    return user
+
+
+@pytest.fixture(scope="module")
+async def another_user(session_factory, test_company):
+    """Create a second user in the test company, shared by a module.
+
+    It is committed outside the per-test rollback and deleted once the
+    module finishes, so tests must not modify it.
+    """
+    from app.db.models import User, UserRole, UserStatus
+
+    user = User(
+        company_id=test_company.id,
+        email="another@example.com",
+        password_hash=TEST_USER_PASSWORD_HASH,
+        first_name="Another",
+        last_name="User",
+        role=UserRole.USER,
+        status=UserStatus.ACTIVE,
+        is_active=True
+    )
+    async with session_factory() as session:
+        session.add(user)
+        await session.commit()
+        await session.refresh(user)
+    yield user
+    async with session_factory() as session:
+        await session.delete(await session.merge(user))
+        await session.commit()
+
+
+@pytest.fixture(scope="session")
+async def seeded_users(session_factory, test_company):
+    """Insert twenty users with mixed roles in one bulk statement.
+
+    They stay for the rest of the session, for tests that need a populated
+    users table; nothing may modify them.
+    """
+    from sqlalchemy import insert
+    from app.db.models import User, UserRole, UserStatus
+
+    roles = (UserRole.USER, UserRole.MANAGER, UserRole.VIEWER)
+    rows = [
+        {
+            "company_id": test_company.id,
+            "email": f"seed{i}@example.com",
+            "password_hash": TEST_USER_PASSWORD_HASH,
+            "first_name": "Seed",
+            "last_name": f"User {i}",
+            "role": roles[i % len(roles)],
+            "status": UserStatus.ACTIVE,
+            "is_active": True
+        }
+        for i in range(20)
+    ]
+    async with session_factory() as session:
+        await session.execute(insert(User), rows)
+        await session.commit()
+    return rows
+
+
+@pytest.fixture(scope="session")
+def auth_headers(test_user):
+    """Authorization headers for the test user, signed once per session."""
+    from app.core.security import create_access_token
+
+    # Long enough to outlive any test run
+    token = create_access_token(test_user.id, expires_delta=timedelta(hours=24))
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(scope="session")
+def admin_headers(admin_user):
+    """Authorization headers for the company admin, signed once per session.
+
+    Requesting admin_user only makes sure the row exists; the token is
+    signed for its known id.
+    """
+    from app.core.security import create_access_token
+
+    token = create_access_token(ADMIN_USER_ID, expires_delta=timedelta(hours=24))
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(scope="module")
+def header_auth(app, auth_headers, admin_headers, test_user):
+    """Resolve the session's own bearer tokens without decoding them.
+
+    get_current_user is overridden so auth_headers and admin_headers map
+    straight to their user ids, loaded by primary key; any other token
+    still goes through the real dependency, so 401 paths keep working.
+    The override is removed when the requesting module finishes.
+    """
+    from fastapi import Depends
+    from app.api import deps
+    from app.db.models import User
+
+    def bearer(headers):
+        return headers["Authorization"].removeprefix("Bearer ")
+
+    known_tokens = {
+        bearer(auth_headers): test_user.id,
+        bearer(admin_headers): ADMIN_USER_ID,
+    }
+
+    async def current_user(
+        db: AsyncSession = Depends(deps.get_db),
+        token: str = Depends(deps.oauth2_scheme)
+    ):
+        user_id = known_tokens.get(token)
+        if user_id is None:
+            return await deps.get_current_user(db, token)
+        return await db.get(User, user_id)
+
+    app.dependency_overrides[deps.get_current_user] = current_user
+    yield
+    app.dependency_overrides.pop(deps.get_current_user, None)
+
+
+def _new_tender(company, user):
+    """Build an unsaved published tender owned by the test company."""
+    from app.db.models import Tender, TenderStatus
+
+    return Tender(
+        company_id=company.id,
+        created_by_id=user.id,
+        title="Test Tender",
+        description="Test tender description",
+        submission_deadline=datetime(2024, 12, 31, 23, 59, 59, tzinfo=timezone.utc),
+        status=TenderStatus.PUBLISHED,
+        estimated_value=100000.0
+    )
+
+
+@pytest.fixture
+async def test_tender(db_session, test_company, test_user):
+    """Create a test tender that the test is free to change."""
+    tender = _new_tender(test_company, test_user)
+    db_session.add(tender)
+    await db_session.commit()
+    await db_session.refresh(tender)
+    return tender
+
+
+@pytest.fixture(scope="class")
+async def readonly_tender(session_factory, test_company, test_user):
+    """Create a tender shared by a class of tests that only read it.
+
+    It is committed outside the per-test rollback and deleted once the
+    class finishes, so tests must not modify it.
+    """
+    tender = _new_tender(test_company, test_user)
+    async with session_factory() as session:
+        session.add(tender)
+        await session.commit()
+        await session.refresh(tender)
+    yield tender
+    async with session_factory() as session:
+        await session.delete(await session.merge(tender))
+        await session.commit()
+
+
+@pytest.fixture
+async def test_supplier(db_session, test_company):
+    """Create a test supplier."""
+    from app.db.models import Supplier
+
+    supplier = Supplier(
+        company_id=test_company.id,
+        name="Test Supplier",
+        cnpj="98765432000199",
+        email="supplier@test.com",
+        phone="11888888888",
+        address_city="Supplier City",
+        address_state="RJ",
+        address_zip_code="87654-321"
+    )
+    db_session.add(supplier)
+    await db_session.commit()
+    await db_session.refresh(supplier)
+    return supplier
+
+
+@pytest.fixture
+async def test_quote(db_session, test_tender, test_supplier, test_user):
+    """Create a test quote."""
+    from app.db.models import Quote, QuoteStatus
+
+    quote = Quote(
+        tender_id=test_tender.id,
+        supplier_id=test_supplier.id,
+        created_by_id=test_user.id,
+        total_value=50000.0,
+        status=QuoteStatus.DRAFT,
+        valid_until=datetime(2024, 12, 30, 23, 59, 59, tzinfo=timezone.utc)
+    )
+    db_session.add(quote)
+    await db_session.commit()
+    await db_session.refresh(quote)
+    return quote
+
+
+@pytest.fixture
+async def many_quotes(db_session, test_tender, test_supplier, test_user):
+    """Insert a batch of draft quotes in one bulk statement."""
+    from sqlalchemy import insert
+    from app.db.models import Quote, QuoteStatus
+
+    rows = [
+        {
+            "tender_id": test_tender.id,
+            "supplier_id": test_supplier.id,
+            "created_by_id": test_user.id,
+            "total_value": float(i),
+            "status": QuoteStatus.DRAFT
+        }
+        for i in range(20)
+    ]
+    await db_session.execute(insert(Quote), rows)
+    await db_session.flush()
+    return rows
+
+
+@pytest.fixture
+def submitted_quote(client, auth_headers, test_quote):
+    """The test quote after it has been submitted."""
+    response = client.post(f"/api/v1/quotes/{test_quote.id}/submit", headers=auth_headers)
+    assert response.status_code == 200
+    return test_quote
+
+
+@asynccontextmanager
+async def _no_lifespan(app: FastAPI):
+    """Stand-in lifespan so the test client never starts the real services."""
+    yield
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    """Test client shared by the whole session.
+
+    The client is entered once, so every request reuses one portal thread
+    and event loop instead of starting a fresh one per call. The real
+    lifespan is swapped out meanwhile, so no external databases are
+    contacted.
+    """
+    lifespan = app.router.lifespan_context
+    app.router.lifespan_context = _no_lifespan
+    try:
+        with TestClient(app) as client:
+            yield client
+    finally:
+        app.router.lifespan_context = lifespan
+
+
+@pytest.fixture(scope="session")
+async def async_client(app):
+    """Async client shared by the whole session so its connection pool stays warm.
+
+    ASGITransport calls the app in-process with no sockets, so the limits
+    only matter if a test points this client at a real server. They are
+    set anyway so such a test reuses pooled keep-alive connections instead
+    of opening new ones. HTTP/1.1 only: the ASGI transport never
+    negotiates HTTP/2.
+    """
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://test",
+        limits=httpx.Limits(max_keepalive_connections=50, max_connections=100)
+    )
+    yield client
+    await client.aclose()
+
+
+@pytest.fixture
+def tight_rate_limit(monkeypatch):
+    """Shrink the burst limit so rate limiting trips after a couple of requests."""
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "RATE_LIMIT_BURST", 2)
+    return settings.RATE_LIMIT_BURST
+
+
+@pytest.fixture
+async def fake_redis(anyio_backend):
+    """In-process Redis emulator wired into the middleware."""
+    from app.middleware.rate_limiting import RATE_LIMIT_SCRIPT
+
+    redis = fakeredis.aioredis.FakeRedis()
+    # Preload the rate limit script so EVALSHA hits on the first request
+    await redis.script_load(RATE_LIMIT_SCRIPT)
+
+    with patch("app.middleware.rate_limiting.get_redis", AsyncMock(return_value=redis)), \
+            patch("app.middleware.session_control.get_redis", AsyncMock(return_value=redis)), \
+            patch("app.core.session_cache.get_redis", AsyncMock(return_value=redis)):
+        yield redis
+
+    await redis.flushdb()
+    await redis.aclose()
@@ -0,0 +1,25 @@
+"""
+Integration tests for authentication across read endpoints.
+"""
+import pytest
+from httpx import AsyncClient
+
+# Any well-formed ID; authentication must fail before it is looked up
+_RESOURCE_ID = "00000000-0000-0000-0000-000000000001"
+
+pytestmark = pytest.mark.xdist_group("endpoints")
+
+
+@pytest.mark.integration
+@pytest.mark.anyio
+@pytest.mark.parametrize("path", [
+    "/api/v1/quotes/",
+    f"/api/v1/quotes/{_RESOURCE_ID}",
+    "/api/v1/quotes/stats",
+    "/api/v1/suppliers/",
+    f"/api/v1/suppliers/{_RESOURCE_ID}",
+])
+async def test_unauthorized_access(async_client: AsyncClient, path):
+    """Test that read endpoints reject requests without credentials."""
+    response = await async_client.get(path)
+    assert response.status_code == 401
@@ -26,7 +26,7 @@ from app.schemas.tender import TenderCreate
 class TestAITasks:
     """Test AI processing tasks."""
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_analyze_tender_task_success(self, test_db, mock_ai_service, test_company, test_user):
         """Test successful tender analysis task."""
         # Create test tender
@@ -67,7 +67,7 @@ class TestAITasks:
         assert len(result["analysis"]["risk_factors"]) == 2
         mock_ai_service.analyze_tender.assert_called_once()
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_analyze_tender_task_not_found(self, test_db):
         """Test tender analysis task with non-existent tender."""
         fake_id = str(uuid4())
@@ -76,7 +76,7 @@ class TestAITasks:
         
         assert result["error"] == "Tender not found"
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_generate_quote_suggestions_task(self, test_db, mock_ai_service, test_company, test_user):
         """Test quote suggestions generation task."""
         # Create test tender
@@ -116,7 +116,7 @@ class TestAITasks:
         assert result["suggestions"]["timeline_days"] == 45
         assert result["suggestions"]["risk_assessment"] == "medium"
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_ai_task_error_handling(self, test_db, mock_ai_service):
         """Test AI task error handling."""
         # Mock AI service to raise an exception
@@ -134,7 +134,7 @@ class TestAITasks:
 class TestEmailTasks:
     """Test email sending tasks."""
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_send_email_task_success(self, mock_email_service):
         """Test successful email sending."""
         # Mock email service
@@ -154,7 +154,7 @@ class TestEmailTasks:
         assert result["recipients"] == ["test@example.com"]
         mock_email_service.send_email.assert_called_once()
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_send_notification_email_task(self, mock_email_service, test_user):
         """Test notification email sending."""
         mock_email_service.send_notification_email.return_value = True
@@ -172,7 +172,7 @@ class TestEmailTasks:
         assert result["status"] == "sent"
         assert result["notification_type"] == "tender_deadline"
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_send_bulk_emails_task(self, mock_email_service):
         """Test bulk email sending."""
         email_batch = [
@@ -199,7 +199,7 @@ class TestEmailTasks:
         assert result["failed"] == 0
         assert mock_email_service.send_email.call_count == 2
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_email_task_failure_handling(self, mock_email_service):
         """Test email task failure handling."""
         # Mock email service to fail
@@ -219,7 +219,7 @@ class TestEmailTasks:
 class TestFileTasks:
     """Test file processing tasks."""
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_process_file_upload_task(self, mock_file_service):
         """Test file upload processing."""
         file_data = {
@@ -243,7 +243,7 @@ class TestFileTasks:
         assert result["file_id"] == file_data["file_id"]
         assert result["metadata"]["pages"] == 10
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_cleanup_temp_files_task(self, mock_file_service):
         """Test temporary files cleanup."""
         mock_file_service.cleanup_temp_files.return_value = {
@@ -257,7 +257,7 @@ class TestFileTasks:
         assert result["deleted_files"] == 15
         assert result["freed_space_mb"] == 250
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_generate_file_preview_task(self, mock_file_service):
         """Test file preview generation."""
         file_id = str(uuid4())
@@ -278,7 +278,7 @@ class TestFileTasks:
 class TestNotificationTasks:
     """Test notification tasks."""
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_send_push_notification_task(self, mock_notification_service):
         """Test push notification sending."""
         notification_data = {
@@ -296,7 +296,7 @@ class TestNotificationTasks:
         assert result["status"] == "sent"
         assert result["title"] == "New Quote Received"
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_cleanup_expired_notifications_task(self, mock_notification_service):
         """Test expired notifications cleanup."""
         mock_notification_service.cleanup_expired.return_value = {
@@ -308,7 +308,7 @@ class TestNotificationTasks:
         
         assert result["deleted_count"] == 42
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_send_websocket_notification_task(self, mock_websocket_manager):
         """Test WebSocket notification sending."""
         notification_data = {
@@ -327,7 +327,7 @@ class TestNotificationTasks:
 class TestCalendarTasks:
     """Test calendar integration tasks."""
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_sync_calendar_events_task(self, mock_calendar_service):
         """Test calendar events synchronization."""
         user_id = str(uuid4())
@@ -345,7 +345,7 @@ class TestCalendarTasks:
         assert result["synced_events"] == 5
         assert result["new_events"] == 2
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_send_deadline_reminders_task(self, mock_calendar_service, mock_email_service):
         """Test deadline reminders sending."""
         mock_calendar_service.get_upcoming_deadlines.return_value = [
@@ -365,7 +365,7 @@ class TestCalendarTasks:
         assert result["reminders_sent"] == 1
         mock_email_service.send_deadline_reminder.assert_called_once()
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_create_calendar_event_task(self, mock_calendar_service):
         """Test calendar event creation."""
         event_data = {
@@ -392,7 +392,7 @@ class TestCalendarTasks:
 class TestTaskIntegration:
     """Test task integration and workflow scenarios."""
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_tender_publication_workflow(
         self, 
         test_db, 
@@ -452,7 +452,7 @@ class TestTaskIntegration:
         assert email_result["status"] == "sent"
         assert push_result["status"] == "sent"
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_celery_task_retry_mechanism(self, mock_ai_service):
         """Test Celery task retry mechanism."""
         # Mock service to fail first call, succeed on retry
@@ -474,7 +474,7 @@ class TestTaskIntegration:
                 result = ai_tasks.analyze_tender_task(tender_id)
                 assert result["status"] == "completed"
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_task_performance_monitoring(self, mock_celery_service):
         """Test task performance monitoring."""
         # Execute multiple tasks and monitor performance
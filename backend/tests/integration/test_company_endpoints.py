@@ -207,7 +207,7 @@ class TestCompanyEndpoints:
 
 
 @pytest.mark.integration
-@pytest.mark.asyncio
+@pytest.mark.anyio
 class TestCompanyEndpointsAsync:
     """Test company endpoints with async client."""
     
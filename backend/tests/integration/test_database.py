@@ -37,7 +37,7 @@ class TestDatabaseMigrations:
         config.set_main_option("script_location", "alembic")
         return config
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_migration_structure_validity(self, alembic_config):
         """Test that all migrations are structurally valid."""
         script = ScriptDirectory.from_config(alembic_config)
@@ -55,7 +55,7 @@ class TestDatabaseMigrations:
             assert revision.module.upgrade is not None
             assert revision.module.downgrade is not None
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_migration_chain_integrity(self, alembic_config):
         """Test migration chain integrity."""
         script = ScriptDirectory.from_config(alembic_config)
@@ -72,7 +72,7 @@ class TestDatabaseMigrations:
                 assert revision.down_revision in revision_ids, \
                     f"Down revision {revision.down_revision} not found for {revision.revision}"
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_database_schema_creation(self, test_db_engine):
         """Test database schema creation from scratch."""
         # Drop all tables
@@ -100,7 +100,7 @@ class TestDatabaseMigrations:
             for table in expected_tables:
                 assert table in tables, f"Table {table} not found"
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_table_constraints_and_indexes(self, test_db):
         """Test database constraints and indexes."""
         async with test_db.bind.connect() as conn:
@@ -134,7 +134,7 @@ class TestDatabaseMigrations:
             assert "company_id" in fk_columns
             assert "user_id" in fk_columns
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_data_types_and_columns(self, test_db):
         """Test column data types and nullable constraints."""
         async with test_db.bind.connect() as conn:
@@ -178,7 +178,7 @@ class TestDatabaseMigrations:
 class TestSchemaValidation:
     """Test schema validation and model integrity."""
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_model_relationships(self, test_db, test_user, test_company):
         """Test model relationships work correctly."""
         # Create tender linked to user and company
@@ -206,7 +206,7 @@ class TestSchemaValidation:
         assert tender.user is not None
         assert tender.user.id == test_user.id
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_cascade_delete_behavior(self, test_db, test_user, test_company):
         """Test cascade delete behavior."""
         # Create tender with quotes
@@ -247,7 +247,7 @@ class TestSchemaValidation:
         remaining_quote = await test_db.get(QuoteModel, quote.id)
         # Test should verify expected behavior based on your schema design
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_unique_constraints(self, test_db, test_company):
         """Test unique constraints work correctly."""
         # Create first user
@@ -275,7 +275,7 @@ class TestSchemaValidation:
         with pytest.raises(Exception):  # SQLAlchemy IntegrityError
             await test_db.commit()
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_check_constraints(self, test_db, test_user, test_company):
         """Test check constraints work correctly."""
         # Test budget range constraints
@@ -295,7 +295,7 @@ class TestSchemaValidation:
             test_db.add(tender)
             await test_db.commit()
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_enum_constraints(self, test_db, test_user, test_company):
         """Test enum field constraints."""
         # Test valid enum values
@@ -318,7 +318,7 @@ class TestSchemaValidation:
         # Test invalid enum values would be caught by Pydantic validation
         # before reaching the database
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_json_field_validation(self, test_db, test_user, test_company):
         """Test JSON field validation and storage."""
         # Create tender with JSON requirements
@@ -353,7 +353,7 @@ class TestSchemaValidation:
 class TestDataIntegrity:
     """Test data integrity and validation."""
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_timestamp_fields(self, test_db, test_user, test_company):
         """Test timestamp fields are set correctly."""
         before_creation = datetime.utcnow()
@@ -391,7 +391,7 @@ class TestDataIntegrity:
         
         assert tender.updated_at > original_updated
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_soft_delete_functionality(self, test_db, test_user):
         """Test soft delete functionality if implemented."""
         # Create user session
@@ -417,7 +417,7 @@ class TestDataIntegrity:
         await test_db.refresh(session)
         assert session.is_active is False
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_data_consistency_across_tables(self, test_db, test_user, test_company):
         """Test data consistency across related tables."""
         # Create tender
@@ -459,7 +459,7 @@ class TestDataIntegrity:
             assert quote.tender_id == tender.id
             assert quote.supplier_id == test_user.id
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_database_transaction_rollback(self, test_db, test_user, test_company):
         """Test transaction rollback behavior."""
         initial_count = await test_db.scalar(
@@ -511,7 +511,7 @@ class TestDataIntegrity:
 class TestPerformanceAndOptimization:
     """Test database performance and optimization."""
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_index_effectiveness(self, test_db, test_user, test_company):
         """Test that indexes improve query performance."""
         # Create multiple tenders for testing
@@ -551,7 +551,7 @@ class TestPerformanceAndOptimization:
         assert query_time < 1.0
         assert len(tenders_found) == 50
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_bulk_operations_performance(self, test_db, test_user, test_company):
         """Test bulk operations performance."""
         # Prepare bulk data
@@ -589,7 +589,7 @@ class TestPerformanceAndOptimization:
         )
         assert count == 100
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_connection_pool_behavior(self):
         """Test database connection pool behavior."""
         # Test multiple concurrent connections
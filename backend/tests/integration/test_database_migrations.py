@@ -219,7 +219,7 @@ class TestDatabaseMigrations:
         if self.original_revision:
             self.helper.migrate_to_revision(self.original_revision)
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_migration_up_and_down(self):
         """Test that migrations can be applied and rolled back successfully."""
         async with get_db() as db:
@@ -275,7 +275,7 @@ class TestDatabaseMigrations:
                 if 'down_metrics' in locals():
                     assert down_metrics.get('duration_seconds', 0) < 300, f"Rollback of {migration} took too long: {down_metrics.get('duration_seconds')}s"
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_schema_changes_validation(self):
         """Test that schema changes are correctly applied."""
         async with get_db() as db:
@@ -310,7 +310,7 @@ class TestDatabaseMigrations:
                             # (You'd need to check migration content to be sure)
                             print(f"Warning: Table {table_name} was dropped in migration {migration}")
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_data_preservation_during_migration(self):
         """Test that existing data is preserved during migrations."""
         async with get_db() as db:
@@ -375,7 +375,7 @@ class TestDatabaseMigrations:
             print(f"Error creating test data: {e}")
             return {}
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_migration_idempotency(self):
         """Test that migrations are idempotent (can be run multiple times safely)."""
         migrations = self.helper.get_migration_history()
@@ -408,7 +408,7 @@ class TestDatabaseMigrations:
         assert schema_first == schema_second, "Schema changed on second migration application"
         assert counts_first == counts_second, "Data changed on second migration application"
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_migration_performance_benchmarks(self):
         """Test migration performance and set benchmarks."""
         migrations = self.helper.get_migration_history()
@@ -449,7 +449,7 @@ class TestDatabaseMigrations:
             print(f"  {migration}: {metrics['duration_seconds']:.2f}s, "
                   f"{metrics['memory_delta_mb']:.2f}MB memory delta")
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_concurrent_migration_safety(self):
         """Test that migrations handle concurrent database access safely."""
         migrations = self.helper.get_migration_history()
@@ -507,7 +507,7 @@ class TestDatabaseMigrations:
                 assert hasattr(revision.module, 'downgrade'), \
                     f"Migration {migration} missing downgrade function"
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_rollback_data_integrity(self):
         """Test that rollbacks maintain data integrity."""
         async with get_db() as db:
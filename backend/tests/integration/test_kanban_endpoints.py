@@ -383,7 +383,7 @@ class TestKanbanEndpoints:
 
 
 @pytest.mark.integration
-@pytest.mark.asyncio
+@pytest.mark.anyio
 class TestKanbanEndpointsAsync:
     """Test Kanban endpoints with async client."""
     
@@ -4,24 +4,63 @@ Comprehensive tests for middleware components.
 import pytest
 import time
 import asyncio
+import statistics
 from datetime import datetime, timedelta
 from unittest.mock import patch, MagicMock, AsyncMock
 from uuid import uuid4
 
+import httpx
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.testclient import TestClient
 from starlette.responses import JSONResponse
 
-from app.middleware.rate_limiting import RateLimitMiddleware, RateLimitRule
+from app.middleware.rate_limiting import RateLimitMiddleware, RateLimitRule, RATE_LIMIT_SCRIPT_SHA
 from app.middleware.session_control import SessionControlMiddleware
+from app.crud.user_session import CRUDUserSession
 from app.models.user_session import UserSessionModel
-from app.core.security import create_access_token
+from app.core.security import create_access_token, decode_access_token, _decode_token_cached
+
+
+@pytest.fixture(autouse=True)
+async def reset_middleware_state(fake_redis):
+    """Start every test from empty Redis and token caches.
+
+    The apps and clients below are shared per module, so nothing a test
+    leaves behind may leak into the next one.
+    """
+    await fake_redis.flushdb()
+    _decode_token_cached.cache_clear()
+    yield
+
+
+@pytest.fixture
+def session_store():
+    """Patch the session CRUD layer with one shared set of mocks.
+
+    ``session_store.session`` is returned by every lookup; tests replace it
+    before making requests and assert on the mocks afterwards.
+    """
+    store = MagicMock()
+    store.session = MagicMock(
+        is_active=True,
+        expires_at=datetime.utcnow() + timedelta(hours=24),
+        last_activity=datetime.utcnow()
+    )
+    store.get_active_session = AsyncMock(side_effect=lambda *args, **kwargs: store.session)
+    store.get_user_active_sessions = AsyncMock(side_effect=lambda *args, **kwargs: [store.session])
+    store.update_last_activity = AsyncMock()
+    
+    with patch('app.middleware.session_control.get_db'), \
+            patch.object(CRUDUserSession, 'get_active_session', store.get_active_session, create=True), \
+            patch.object(CRUDUserSession, 'get_user_active_sessions', store.get_user_active_sessions, create=True), \
+            patch.object(CRUDUserSession, 'update_last_activity', store.update_last_activity, create=True):
+        yield store
 
 
 class TestRateLimitMiddleware:
     """Test rate limiting middleware."""
     
-    @pytest.fixture
+    @pytest.fixture(scope="module")
     def app_with_rate_limit(self):
         """Create test app with rate limiting."""
         app = FastAPI()
@@ -31,6 +70,10 @@ class TestRateLimitMiddleware:
         async def test_endpoint():
             return {"message": "success"}
         
+        @app.get("/api/v1/test")
+        async def api_test_endpoint():
+            return {"message": "success"}
+        
         @app.post("/auth/login")
         async def login_endpoint():
             return {"token": "test_token"}
@@ -41,7 +84,7 @@ class TestRateLimitMiddleware:
         
         return app
     
-    @pytest.fixture
+    @pytest.fixture(scope="module")
     def client_with_rate_limit(self, app_with_rate_limit):
         """Create test client with rate limiting."""
         return TestClient(app_with_rate_limit)
@@ -58,153 +101,197 @@ class TestRateLimitMiddleware:
         rule_with_burst = RateLimitRule(requests=100, window=3600, per="user", burst=150)
         assert rule_with_burst.burst == 150
     
-    @pytest.mark.asyncio
-    async def test_ip_based_rate_limiting(self, client_with_rate_limit, mock_redis_service):
+    @pytest.mark.anyio
+    async def test_ip_based_rate_limiting(self, client_with_rate_limit, fake_redis):
         """Test IP-based rate limiting."""
-        # Mock Redis to track requests
-        request_counts = {}
-        
-        async def mock_get(key):
-            return request_counts.get(key, "0").encode()
-        
-        async def mock_setex(key, timeout, value):
-            request_counts[key] = value
-            
-        async def mock_incr(key):
-            current = int(request_counts.get(key, "0"))
-            request_counts[key] = str(current + 1)
-            return current + 1
+        # First request should succeed
+        response = client_with_rate_limit.get("/test")
+        assert response.status_code == 200
         
-        mock_redis_service.get = mock_get
-        mock_redis_service.setex = mock_setex
-        mock_redis_service.incr = mock_incr
-        
-        with patch('app.middleware.rate_limiting.get_redis', return_value=mock_redis_service):
-            # First request should succeed
+        # Simulate many requests from same IP
+        for _ in range(10):
             response = client_with_rate_limit.get("/test")
-            assert response.status_code == 200
-            
-            # Simulate many requests from same IP
-            for _ in range(10):
-                response = client_with_rate_limit.get("/test")
-                # In a real test with actual limits, some would be blocked
+        
+        # Every request from the same IP counts against one key
+        assert int(await fake_redis.get("rate_limit:ip:testclient:3600")) == 11
     
-    @pytest.mark.asyncio
-    async def test_user_based_rate_limiting(self, client_with_rate_limit, mock_redis_service, test_user):
+    @pytest.mark.anyio
+    async def test_user_based_rate_limiting(self, client_with_rate_limit, fake_redis):
         """Test user-based rate limiting."""
-        # Create access token
-        access_token = create_access_token(
-            data={"sub": str(test_user.id), "user_id": test_user.id}
-        )
+        # The middleware only reads the token's subject, so no user row is needed
+        user_id = uuid4()
+        access_token = create_access_token(user_id)
         
         headers = {"Authorization": f"Bearer {access_token}"}
         
-        request_counts = {}
+        # IP and user scopes are checked together by one script call
+        evalsha = AsyncMock(wraps=fake_redis.evalsha)
+        incr = AsyncMock(wraps=fake_redis.incr)
         
-        async def mock_get(key):
-            return request_counts.get(key, "0").encode()
-        
-        async def mock_incr(key):
-            current = int(request_counts.get(key, "0"))
-            request_counts[key] = str(current + 1)
-            return current + 1
-        
-        mock_redis_service.get = mock_get
-        mock_redis_service.incr = mock_incr
-        
-        with patch('app.middleware.rate_limiting.get_redis', return_value=mock_redis_service):
+        with patch.object(fake_redis, "evalsha", evalsha), patch.object(fake_redis, "incr", incr):
             # Make authenticated requests
             for i in range(5):
-                response = client_with_rate_limit.get("/test", headers=headers)
+                response = client_with_rate_limit.get("/api/v1/test", headers=headers)
                 assert response.status_code == 200
+        
+        # One decision round-trip per request instead of one per scope
+        checks = [c for c in evalsha.await_args_list if c.args[0] == RATE_LIMIT_SCRIPT_SHA]
+        assert len(checks) == 5
+        incr.assert_not_awaited()
+        
+        _, numkeys, *keys_and_args = checks[-1].args
+        assert numkeys == 2
+        assert keys_and_args[0].startswith("rate_limit:ip:")
+        assert int(await fake_redis.get(f"rate_limit:user:{user_id}:300")) == 5
     
-    @pytest.mark.asyncio
-    async def test_auth_endpoint_rate_limiting(self, client_with_rate_limit, mock_redis_service):
+    @pytest.mark.anyio
+    async def test_auth_endpoint_rate_limiting(self, client_with_rate_limit, fake_redis):
         """Test stricter rate limiting on auth endpoints."""
-        request_counts = {}
-        
-        async def mock_get(key):
-            count = request_counts.get(key, "0")
-            return count.encode()
-        
-        async def mock_incr(key):
-            current = int(request_counts.get(key, "0"))
-            request_counts[key] = str(current + 1)
-            return current + 1
-        
-        async def mock_expire(key, timeout):
-            pass
-        
-        mock_redis_service.get = mock_get
-        mock_redis_service.incr = mock_incr
-        mock_redis_service.expire = mock_expire
-        
-        with patch('app.middleware.rate_limiting.get_redis', return_value=mock_redis_service):
-            # Auth endpoints should have stricter limits
-            for i in range(3):
-                response = client_with_rate_limit.post("/auth/login", json={
-                    "username": "test@example.com",
-                    "password": "password"
-                })
-                # First few requests should succeed
-                assert response.status_code in [200, 422]  # 422 for validation errors
-    
-    @pytest.mark.asyncio
-    async def test_rate_limit_headers(self, client_with_rate_limit, mock_redis_service):
+        # Auth endpoints should have stricter limits
+        for i in range(3):
+            response = client_with_rate_limit.post("/auth/login", json={
+                "username": "test@example.com",
+                "password": "password"
+            })
+            # First few requests should succeed
+            assert response.status_code in [200, 422]  # 422 for validation errors
+    
+    @pytest.mark.anyio
+    async def test_rate_limit_headers(self, client_with_rate_limit, fake_redis):
         """Test rate limit headers in response."""
-        request_counts = {}
-        
-        async def mock_get(key):
-            return request_counts.get(key, "0").encode()
-        
-        async def mock_incr(key):
-            current = int(request_counts.get(key, "0"))
-            request_counts[key] = str(current + 1)
-            return current + 1
+        response = client_with_rate_limit.get("/test")
+        
+        # Should include rate limit headers
+        assert response.status_code == 200
+        assert response.headers["X-RateLimit-Limit"] == "1000"
+        assert response.headers["X-RateLimit-Remaining"] == "999"
+        
+        # Sharded rules split the logical limit evenly across their shards
+        rule = RateLimitRule(requests=480, window=60, per="global", shards=16)
+        assert rule.shard_limit * rule.shards == rule.requests
+        assert rule.build_headers(0, 0)["X-RateLimit-Limit"] == "480"
+        
+        # Limits the shards can't split evenly would advertise the wrong total
+        with pytest.raises(ValueError):
+            RateLimitRule(requests=100, window=60, per="global", shards=16)
+        with pytest.raises(ValueError):
+            RateLimitRule(requests=10, window=60, per="global", shards=16)
+    
+    @pytest.mark.anyio
+    async def test_shard_distribution(self):
+        """Test that requests to a sharded rule are spread across its keys."""
+        middleware = RateLimitMiddleware(FastAPI())
+        rule = RateLimitRule(requests=480, window=60, per="global", shards=16)
+        request = Request({
+            "type": "http",
+            "method": "POST",
+            "path": "/api/v1/auth/login",
+            "headers": [(b"x-forwarded-for", b"10.0.0.1")],
+            "client": ("127.0.0.1", 12345),
+        })
         
-        mock_redis_service.get = mock_get
-        mock_redis_service.incr = mock_incr
+        keys = [await middleware.get_rate_limit_key(request, rule) for _ in range(32)]
         
-        with patch('app.middleware.rate_limiting.get_redis', return_value=mock_redis_service):
-            response = client_with_rate_limit.get("/test")
-            
-            # Should include rate limit headers
-            assert "X-RateLimit-Limit" in response.headers or response.status_code == 200
-            assert "X-RateLimit-Remaining" in response.headers or response.status_code == 200
+        assert all(key.startswith("rate_limit:global:/api/v1/auth/login:60:") for key in keys)
+        # Even one client's requests use every shard, so it can reach the whole global budget
+        assert len(set(keys)) == rule.shards
+    
+    @pytest.mark.anyio
+    async def test_tightest_scope_compares_whole_sharded_quota(self, fake_redis):
+        """Test that a sharded scope is reported by its quota across all shards."""
+        middleware = RateLimitMiddleware(FastAPI())
+        ip_rule = RateLimitRule(requests=10, window=900, per="ip")
+        global_rule = RateLimitRule(requests=480, window=60, per="global", shards=16)
+        
+        # 9 left on the IP scope against 5 on the shard, i.e. 80 overall
+        await fake_redis.set("rate_limit:global:/api/v1/auth/login:60:0", 24, ex=60)
+        allowed, rule, remaining, _ = await middleware.check_rate_limits([
+            ("rate_limit:ip:10.0.0.1:900", ip_rule),
+            ("rate_limit:global:/api/v1/auth/login:60:0", global_rule),
+        ])
+        
+        assert allowed
+        assert rule is ip_rule
+        assert remaining == 9
     
-    @pytest.mark.asyncio
-    async def test_burst_rate_limiting(self, client_with_rate_limit, mock_redis_service):
+    def test_rate_limit_header_build(self):
+        """Test the rate limit headers built for a request."""
+        rule = RateLimitRule(requests=100, window=300, per="user")
+        assert rule.build_headers(42, 1700000000) == {
+            "X-RateLimit-Limit": "100",
+            "X-RateLimit-Remaining": "42",
+            "X-RateLimit-Reset": "1700000000",
+        }
+    
+    @pytest.mark.slow
+    def test_rate_limit_header_build_performance(self):
+        """Test that building rate limit headers stays cheap."""
+        rule = RateLimitRule(requests=100, window=300, per="user")
+        iterations = 10_000
+        start = time.perf_counter_ns()
+        for i in range(iterations):
+            rule.build_headers(i, 1700000000)
+        per_build_ns = (time.perf_counter_ns() - start) / iterations
+        
+        assert per_build_ns < 5_000  # < 5µs per header build
+    
+    def test_redis_client_uses_hiredis(self):
+        """Test that the shared Redis pool is bounded and parses with hiredis."""
+        pytest.importorskip("hiredis")
+        from app.db.session import create_redis_pool
+        
+        pool = create_redis_pool()
+        assert pool.max_connections == 64
+        assert pool.timeout == 0.5
+        assert pool.make_connection()._parser.__class__.__name__ == "HiredisParser"
+    
+    @pytest.mark.anyio
+    async def test_burst_rate_limiting(self, client_with_rate_limit, fake_redis):
         """Test burst rate limiting functionality."""
-        # Test that burst allows temporary spikes
-        request_counts = {}
-        
-        async def mock_get(key):
-            return request_counts.get(key, "0").encode()
-        
-        async def mock_incr(key):
-            current = int(request_counts.get(key, "0"))
-            request_counts[key] = str(current + 1)
-            return current + 1
-        
-        mock_redis_service.get = mock_get
-        mock_redis_service.incr = mock_incr
+        # Rapid requests within burst limit
+        responses = []
+        for i in range(5):
+            response = client_with_rate_limit.get("/test")
+            responses.append(response)
         
-        with patch('app.middleware.rate_limiting.get_redis', return_value=mock_redis_service):
-            # Rapid requests within burst limit
-            responses = []
-            for i in range(5):
-                response = client_with_rate_limit.get("/test")
-                responses.append(response)
-            
-            # All should succeed within burst
-            assert all(r.status_code == 200 for r in responses)
+        # All should succeed within burst
+        assert all(r.status_code == 200 for r in responses)
+    
+    @pytest.mark.anyio
+    async def test_script_loaded_on_first_use(self, client_with_rate_limit, fake_redis):
+        """Test that requests still count when Redis has not cached the script."""
+        await fake_redis.script_flush()
+        
+        response = client_with_rate_limit.get("/test")
+        
+        # EVALSHA misses, EVAL runs and caches the script for the next request
+        assert response.status_code == 200
+        assert response.headers["X-RateLimit-Remaining"] == "999"
+        assert await fake_redis.script_exists(RATE_LIMIT_SCRIPT_SHA) == [True]
+        assert int(await fake_redis.get("rate_limit:ip:testclient:3600")) == 1
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
+    async def test_concurrent_burst_respects_limit(self, app_with_rate_limit, fake_redis):
+        """Test that a concurrent burst never overshoots the limit."""
+        transport = httpx.ASGITransport(app=app_with_rate_limit)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(*[
+                client.post("/api/v1/auth/login", headers={"X-Forwarded-For": "10.1.1.1"})
+                for _ in range(25)
+            ])
+        
+        # Checking and counting happen in one script call, so exactly the limit gets through
+        statuses = [r.status_code for r in responses]
+        assert statuses.count(200) + statuses.count(404) == 10
+        assert statuses.count(429) == 15
+        assert int(await fake_redis.get("rate_limit:ip:10.1.1.1:900")) == 10
+    
+    @pytest.mark.anyio
     async def test_rate_limit_redis_failure(self, client_with_rate_limit):
         """Test rate limiting behavior when Redis is unavailable."""
         # Mock Redis to raise exception
         mock_redis = MagicMock()
-        mock_redis.get.side_effect = Exception("Redis connection failed")
+        mock_redis.evalsha.side_effect = Exception("Redis connection failed")
         
         with patch('app.middleware.rate_limiting.get_redis', return_value=mock_redis):
             # Should still allow requests when Redis fails (graceful degradation)
@@ -215,7 +302,7 @@ class TestRateLimitMiddleware:
 class TestSessionControlMiddleware:
     """Test session control middleware."""
     
-    @pytest.fixture
+    @pytest.fixture(scope="module")
     def app_with_session_control(self):
         """Create test app with session control."""
         app = FastAPI()
@@ -235,28 +322,42 @@ class TestSessionControlMiddleware:
         
         return app
     
-    @pytest.fixture
+    @pytest.fixture(scope="module")
     def client_with_session_control(self, app_with_session_control):
         """Create test client with session control."""
         return TestClient(app_with_session_control)
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_session_validation_excluded_paths(self, client_with_session_control):
         """Test that excluded paths bypass session validation."""
-        # Public endpoints should work without session
-        response = client_with_session_control.get("/docs")
-        assert response.status_code in [200, 404]  # 404 if docs not configured
-        
-        response = client_with_session_control.post("/api/v1/auth/login", json={
-            "username": "test@example.com",
-            "password": "password"
-        })
-        assert response.status_code in [200, 422]  # 422 for validation errors
-        
-        response = client_with_session_control.get("/health")
-        assert response.status_code in [200, 404]  # 404 if health endpoint not configured
+        with patch('app.middleware.session_control.get_db') as mock_get_db:
+            # Public endpoints should work without session
+            response = client_with_session_control.get("/docs")
+            assert response.status_code in [200, 404]  # 404 if docs not configured
+            
+            response = client_with_session_control.post("/api/v1/auth/login", json={
+                "username": "test@example.com",
+                "password": "password"
+            })
+            assert response.status_code in [200, 422]  # 422 for validation errors
+            
+            response = client_with_session_control.get("/health")
+            assert response.status_code in [200, 404]  # 404 if health endpoint not configured
+            
+            # Excluded paths never reach the session lookup
+            mock_get_db.assert_not_called()
+    
+    def test_excluded_path_matching(self):
+        """Test exact and prefix matching of excluded paths."""
+        middleware = SessionControlMiddleware(FastAPI())
+        
+        assert middleware.is_excluded_path("/docs")
+        assert middleware.is_excluded_path("/docs/oauth2-redirect")
+        assert middleware.is_excluded_path("/api/v1/auth/login")
+        assert not middleware.is_excluded_path("/protected")
+        assert not middleware.is_excluded_path("/api/v1/users/")
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_valid_session_access(self, client_with_session_control, test_db, test_user):
         """Test access with valid session."""
         # Create valid session
@@ -293,7 +394,7 @@ class TestSessionControlMiddleware:
             # In real scenario, this would check session validity
             assert response.status_code in [200, 401]  # Depends on actual session validation
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_expired_session_rejection(self, client_with_session_control, test_db, test_user):
         """Test rejection of expired sessions."""
         # Create expired session
@@ -329,7 +430,7 @@ class TestSessionControlMiddleware:
             response = client_with_session_control.get("/protected", headers=headers)
             assert response.status_code in [401, 403]  # Should be unauthorized
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_inactive_session_rejection(self, client_with_session_control, test_db, test_user):
         """Test rejection of inactive sessions."""
         # Create inactive session
@@ -365,9 +466,9 @@ class TestSessionControlMiddleware:
             response = client_with_session_control.get("/protected", headers=headers)
             assert response.status_code in [401, 403]
     
-    @pytest.mark.asyncio
-    async def test_session_activity_update(self, client_with_session_control, test_db, test_user):
-        """Test that valid sessions update last_activity."""
+    @pytest.mark.anyio
+    async def test_session_activity_update(self, client_with_session_control, fake_redis, session_store, test_user):
+        """Test that last_activity is written at most once per interval."""
         # Create valid session
         session = UserSessionModel(
             id=uuid4(),
@@ -380,33 +481,70 @@ class TestSessionControlMiddleware:
             expires_at=datetime.utcnow() + timedelta(hours=24),
             last_activity=datetime.utcnow() - timedelta(minutes=30)
         )
-        test_db.add(session)
-        await test_db.commit()
-        
-        old_activity = session.last_activity
         
         # Create access token
-        access_token = create_access_token(
-            data={
-                "sub": str(test_user.id), 
-                "user_id": test_user.id,
-                "session_id": str(session.id)
-            }
-        )
+        access_token = create_access_token(test_user.id, session_id=str(session.id))
+        headers = {"Authorization": f"Bearer {access_token}"}
+        
+        session_store.session = session
         
+        # Make consecutive requests within the activity interval
+        for _ in range(10):
+            response = client_with_session_control.get("/protected", headers=headers)
+            assert response.status_code == 200
+        
+        # Only the first request writes last_activity
+        session_store.update_last_activity.assert_awaited_once()
+        assert await fake_redis.ttl(f"act:{session.id}") > 0
+    
+    @pytest.mark.anyio
+    async def test_session_cache_hit_skips_db(self, client_with_session_control, fake_redis, session_store, test_user):
+        """Test that a cached session is validated without a database lookup."""
+        session_id = str(uuid4())
+        session_store.session.user_id = test_user.id
+        
+        access_token = create_access_token(test_user.id, session_id=session_id)
         headers = {"Authorization": f"Bearer {access_token}"}
         
-        with patch('app.middleware.session_control.get_db') as mock_get_db:
-            mock_get_db.return_value.__aenter__.return_value = test_db
-            
-            # Make request
+        first = client_with_session_control.get("/protected", headers=headers)
+        second = client_with_session_control.get("/protected", headers=headers)
+        
+        assert first.status_code == 200
+        assert second.status_code == 200
+        assert await fake_redis.exists(f"sess:{session_id}")
+        # Only the first request reaches the database
+        session_store.get_active_session.assert_awaited_once()
+    
+    @pytest.mark.anyio
+    async def test_excess_session_cleanup_evicts_cache(self, client_with_session_control, fake_redis, session_store, test_user):
+        """Test that sessions deactivated for exceeding the limit lose their cache entries."""
+        now = datetime.utcnow()
+        sessions = [
+            MagicMock(id=uuid4(), user_id=test_user.id, is_active=True,
+                      expires_at=now + timedelta(hours=24), last_activity=now - timedelta(minutes=i))
+            for i in range(5)
+        ]
+        session_store.get_user_active_sessions.side_effect = lambda *args, **kwargs: sessions
+        session_store.deactivate_session = AsyncMock()
+        
+        # The second oldest session is still cached from an earlier request
+        await fake_redis.set(f"sess:{sessions[3].id}", b"{}")
+        
+        # A request on the oldest, uncached session triggers the cleanup
+        session_store.session = sessions[4]
+        access_token = create_access_token(test_user.id, session_id=str(sessions[4].id))
+        headers = {"Authorization": f"Bearer {access_token}"}
+        
+        with patch.object(CRUDUserSession, 'deactivate_session', session_store.deactivate_session, create=True):
             response = client_with_session_control.get("/protected", headers=headers)
-            
-            # Verify session activity was updated (in real scenario)
-            # This test verifies the middleware attempts to update activity
-            assert response.status_code in [200, 401]  # Depends on implementation
+        
+        assert response.status_code == 200
+        assert session_store.deactivate_session.await_count == 2
+        # Neither deactivated session is served from the cache afterwards
+        assert not await fake_redis.exists(f"sess:{sessions[3].id}")
+        assert not await fake_redis.exists(f"sess:{sessions[4].id}")
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_max_sessions_enforcement(self, client_with_session_control, test_db, test_user):
         """Test enforcement of maximum sessions per user."""
         # Create maximum number of active sessions
@@ -433,14 +571,32 @@ class TestSessionControlMiddleware:
         # The middleware itself validates existing sessions
         assert len(sessions) == 3
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_options_request_bypass(self, client_with_session_control):
         """Test that OPTIONS requests bypass session validation."""
         # OPTIONS requests should always be allowed
         response = client_with_session_control.options("/protected")
         assert response.status_code in [200, 405]  # 405 if OPTIONS not implemented
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
+    async def test_options_request_skips_token_decode(self, client_with_session_control):
+        """Test that preflights bypass session validation before any token work."""
+        access_token = create_access_token("user-1", session_id=str(uuid4()))
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Origin": "http://localhost:3000",
+            "Access-Control-Request-Method": "GET",
+        }
+        
+        with patch('app.core.security.jwt.decode', MagicMock()) as mock_decode, \
+                patch('app.middleware.session_control.get_db') as mock_get_db:
+            response = client_with_session_control.options("/protected", headers=headers)
+        
+        assert response.status_code in [200, 405]
+        mock_decode.assert_not_called()
+        mock_get_db.assert_not_called()
+    
+    @pytest.mark.anyio
     async def test_malformed_token_handling(self, client_with_session_control):
         """Test handling of malformed tokens."""
         headers = {"Authorization": "Bearer invalid_token"}
@@ -449,7 +605,30 @@ class TestSessionControlMiddleware:
         response = client_with_session_control.get("/protected", headers=headers)
         assert response.status_code in [401, 422]  # Should be unauthorized
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
+    async def test_jwt_decode_cached(self, client_with_session_control):
+        """Test that repeated presentations of a token are verified once."""
+        _decode_token_cached.cache_clear()
+        payload = {"sub": "user-1", "exp": time.time() + 3600}
+        headers = {"Authorization": "Bearer cached.token.value"}
+        
+        with patch('app.core.security.jwt.decode', return_value=payload) as mock_decode:
+            for _ in range(5):
+                client_with_session_control.get("/protected", headers=headers)
+        
+        mock_decode.assert_called_once()
+        _decode_token_cached.cache_clear()
+    
+    def test_invalid_tokens_not_cached(self):
+        """Test that failed decodes never take up token cache slots."""
+        _decode_token_cached.cache_clear()
+        
+        for i in range(5):
+            assert decode_access_token(f"garbage.token.{i}") is None
+        
+        assert _decode_token_cached.cache_info().currsize == 0
+    
+    @pytest.mark.anyio
     async def test_missing_authorization_header(self, client_with_session_control):
         """Test handling of missing authorization header."""
         # Should handle missing auth header
@@ -460,7 +639,7 @@ class TestSessionControlMiddleware:
 class TestMiddlewareIntegration:
     """Test middleware integration scenarios."""
     
-    @pytest.fixture
+    @pytest.fixture(scope="module")
     def app_with_all_middleware(self):
         """Create test app with all middleware."""
         app = FastAPI()
@@ -480,120 +659,97 @@ class TestMiddlewareIntegration:
         return app
     
     @pytest.fixture
-    def client_with_all_middleware(self, app_with_all_middleware):
-        """Create test client with all middleware."""
-        return TestClient(app_with_all_middleware)
+    async def client_with_all_middleware(self, app_with_all_middleware):
+        """Create async test client with all middleware."""
+        transport = httpx.ASGITransport(app=app_with_all_middleware)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client
     
-    @pytest.mark.asyncio
-    async def test_middleware_execution_order(self, client_with_all_middleware, mock_redis_service):
+    @pytest.mark.anyio
+    async def test_middleware_execution_order(self, client_with_all_middleware, fake_redis):
         """Test that middleware executes in correct order."""
-        request_counts = {}
-        
-        async def mock_get(key):
-            return request_counts.get(key, "0").encode()
+        # Both rate limiting and session control should be applied
+        response = await client_with_all_middleware.get("/protected")
         
-        async def mock_incr(key):
-            current = int(request_counts.get(key, "0"))
-            request_counts[key] = str(current + 1)
-            return current + 1
-        
-        mock_redis_service.get = mock_get
-        mock_redis_service.incr = mock_incr
-        
-        with patch('app.middleware.rate_limiting.get_redis', return_value=mock_redis_service):
-            # Both rate limiting and session control should be applied
-            response = client_with_all_middleware.get("/protected")
-            
-            # Should be processed by both middleware layers
-            assert response.status_code in [200, 401, 429]  # Success, auth error, or rate limited
+        # Should be processed by both middleware layers
+        assert response.status_code in [200, 401, 429]  # Success, auth error, or rate limited
     
-    @pytest.mark.asyncio
-    async def test_rate_limited_session_validation(self, client_with_all_middleware, mock_redis_service):
+    @pytest.mark.anyio
+    async def test_rate_limited_session_validation(self, client_with_all_middleware, fake_redis):
         """Test session validation when rate limited."""
-        # Mock Redis to return high count (rate limited)
-        async def mock_get(key):
-            return b"1000"  # High count to trigger rate limit
+        # Exhaust the per-IP quota so the next request is rejected
+        await fake_redis.set("rate_limit:ip:127.0.0.1:3600", 1000, ex=3600)
         
-        async def mock_incr(key):
-            return 1001
-        
-        mock_redis_service.get = mock_get
-        mock_redis_service.incr = mock_incr
-        
-        with patch('app.middleware.rate_limiting.get_redis', return_value=mock_redis_service):
-            # Should be rate limited before session validation
-            response = client_with_all_middleware.get("/protected")
-            assert response.status_code in [200, 401, 429]
+        # Should be rate limited before session validation
+        response = await client_with_all_middleware.get("/protected")
+        assert response.status_code == 429
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_middleware_error_handling(self, client_with_all_middleware):
         """Test error handling across middleware layers."""
         # Test various error scenarios
         
         # 1. Invalid authorization header
         headers = {"Authorization": "Invalid"}
-        response = client_with_all_middleware.get("/protected", headers=headers)
+        response = await client_with_all_middleware.get("/protected", headers=headers)
         assert response.status_code in [401, 422]
         
         # 2. Malformed JWT
         headers = {"Authorization": "Bearer not.a.jwt"}
-        response = client_with_all_middleware.get("/protected", headers=headers)
+        response = await client_with_all_middleware.get("/protected", headers=headers)
         assert response.status_code in [401, 422]
     
-    @pytest.mark.asyncio
-    async def test_middleware_performance_impact(self, client_with_all_middleware, mock_redis_service):
+    @pytest.mark.anyio
+    async def test_middleware_performance_impact(self, client_with_all_middleware, fake_redis):
         """Test performance impact of multiple middleware layers."""
-        request_counts = {}
-        
-        async def mock_get(key):
-            return request_counts.get(key, "0").encode()
+        # A GET route under the generous global rule, so no request is
+        # rate limited and every one takes the full path through both layers
+        async def timed_request():
+            request_start = time.perf_counter_ns()
+            response = await client_with_all_middleware.get("/protected")
+            assert response.status_code == 200
+            return (time.perf_counter_ns() - request_start) / 1e6
         
-        async def mock_incr(key):
-            current = int(request_counts.get(key, "0"))
-            request_counts[key] = str(current + 1)
-            return current + 1
+        # Warm-up request so first-call import costs are not measured
+        response = await client_with_all_middleware.get("/protected")
+        assert response.status_code == 200
         
-        mock_redis_service.get = mock_get
-        mock_redis_service.incr = mock_incr
+        # Make multiple concurrent requests, timing each one
+        start = time.perf_counter_ns()
+        latencies_ms = await asyncio.gather(*(timed_request() for _ in range(10)))
         
-        with patch('app.middleware.rate_limiting.get_redis', return_value=mock_redis_service):
-            start_time = time.time()
-            
-            # Make multiple requests
-            for _ in range(10):
-                response = client_with_all_middleware.get("/api/v1/auth/login")
-            
-            end_time = time.time()
-            
-            # Should complete within reasonable time
-            execution_time = end_time - start_time
-            assert execution_time < 5.0  # Should be fast
+        # Should stay within the per-request latency budget
+        elapsed_ms = (time.perf_counter_ns() - start) / 1e6 / len(latencies_ms)
+        assert elapsed_ms < 20
+        assert statistics.quantiles(latencies_ms, n=100)[98] < 50
     
-    @pytest.mark.asyncio
-    async def test_concurrent_middleware_requests(self, client_with_all_middleware, mock_redis_service):
+    @pytest.mark.anyio
+    async def test_concurrent_middleware_requests(self, client_with_all_middleware, fake_redis):
         """Test middleware handling of concurrent requests."""
-        request_counts = {}
-        
-        async def mock_get(key):
-            # Simulate small delay for Redis
-            await asyncio.sleep(0.01)
-            return request_counts.get(key, "0").encode()
-        
-        async def mock_incr(key):
-            await asyncio.sleep(0.01)
-            current = int(request_counts.get(key, "0"))
-            request_counts[key] = str(current + 1)
-            return current + 1
-        
-        mock_redis_service.get = mock_get
-        mock_redis_service.incr = mock_incr
-        
-        with patch('app.middleware.rate_limiting.get_redis', return_value=mock_redis_service):
-            # Simulate concurrent requests
-            responses = []
-            for _ in range(5):
-                response = client_with_all_middleware.get("/api/v1/auth/login")
-                responses.append(response)
-            
-            # All requests should be handled properly
-            assert all(r.status_code in [200, 422, 401, 429] for r in responses)
+        n_requests = 50
+        evalsha = fake_redis.evalsha
+        in_flight = peak = 0
+        
+        async def slow_evalsha(*args):
+            # Simulate small delay for Redis, tracking how many calls overlap
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            try:
+                await asyncio.sleep(0.01)
+                return await evalsha(*args)
+            finally:
+                in_flight -= 1
+        
+        with patch.object(fake_redis, "evalsha", slow_evalsha):
+            # Fire concurrent requests so the Redis latency overlaps
+            responses = await asyncio.gather(*(
+                client_with_all_middleware.get("/api/v1/auth/login")
+                for _ in range(n_requests)
+            ))
+        
+        # All requests should be handled properly
+        assert all(r.status_code in [200, 405, 422, 401, 429] for r in responses)
+        
+        # Requests wait on Redis side by side rather than one after another
+        assert peak > 1
@@ -4,30 +4,28 @@ Integration tests for supplier management API endpoints.
 import pytest
 from httpx import AsyncClient
 from fastapi.testclient import TestClient
-from app.models.supplier import Supplier
+
+# Valid supplier payload; tests override the fields they exercise
+_BASE_SUPPLIER = {
+    "name": "New Supplier",
+    "cnpj": "98765432000177",
+    "email": "new@supplier.com",
+    "phone": "11999999999",
+    "address": "Supplier Address, 789",
+    "city": "Supplier City",
+    "state": "MG",
+    "zip_code": "12345-987"
+}
+
+# Keep the module on one xdist worker so it shares the session app and database.
+# Tests that create suppliers go through db_session, so their rows are rolled back.
+pytestmark = pytest.mark.xdist_group("endpoints")
 
 
 @pytest.mark.integration
 class TestSupplierEndpoints:
     """Test supplier management API endpoints."""
     
-    def test_get_suppliers_list(self, client: TestClient, auth_headers):
-        """Test getting list of suppliers."""
-        response = client.get("/api/v1/suppliers/", headers=auth_headers)
-        
-        assert response.status_code == 200
-        data = response.json()
-        assert isinstance(data, list)
-    
-    def test_get_suppliers_pagination(self, client: TestClient, auth_headers):
-        """Test supplier list pagination."""
-        response = client.get("/api/v1/suppliers/?skip=0&limit=5", headers=auth_headers)
-        
-        assert response.status_code == 200
-        data = response.json()
-        assert isinstance(data, list)
-        assert len(data) <= 5
-    
     def test_get_supplier_by_id(self, client: TestClient, auth_headers, test_supplier):
         """Test getting specific supplier by ID."""
         response = client.get(f"/api/v1/suppliers/{test_supplier.id}", headers=auth_headers)
@@ -38,24 +36,22 @@ class TestSupplierEndpoints:
         assert data["name"] == test_supplier.name
         assert data["cnpj"] == test_supplier.cnpj
     
-    def test_get_nonexistent_supplier(self, client: TestClient, auth_headers):
-        """Test getting non-existent supplier."""
-        response = client.get("/api/v1/suppliers/99999", headers=auth_headers)
+    @pytest.mark.parametrize("method,url", [
+        ("get", "/api/v1/suppliers/99999"),
+        ("put", "/api/v1/suppliers/99999"),
+        ("delete", "/api/v1/suppliers/99999"),
+    ])
+    def test_nonexistent_supplier(self, client: TestClient, auth_headers, method, url):
+        """Test operations on a non-existent supplier."""
+        kwargs = {"json": {"name": "Updated Name"}} if method == "put" else {}
+        
+        response = client.request(method, url, headers=auth_headers, **kwargs)
         assert response.status_code == 404
     
+    @pytest.mark.usefixtures("db_session")
     def test_create_supplier_success(self, client: TestClient, auth_headers, test_company):
         """Test successful supplier creation."""
-        supplier_data = {
-            "name": "New Supplier",
-            "cnpj": "98765432000177",
-            "email": "new@supplier.com",
-            "phone": "11999999999",
-            "address": "Supplier Address, 789",
-            "city": "Supplier City",
-            "state": "MG",
-            "zip_code": "12345-987",
-            "company_id": test_company.id
-        }
+        supplier_data = {**_BASE_SUPPLIER, "company_id": test_company.id}
         
         response = client.post("/api/v1/suppliers/", json=supplier_data, headers=auth_headers)
         
@@ -66,49 +62,23 @@ class TestSupplierEndpoints:
         assert data["email"] == supplier_data["email"]
         assert data["company_id"] == supplier_data["company_id"]
     
-    def test_create_supplier_missing_required_fields(self, client: TestClient, auth_headers):
-        """Test creating supplier with missing required fields."""
-        supplier_data = {
-            "name": "Incomplete Supplier"
-            # Missing required fields
-        }
+    @pytest.mark.parametrize("build_payload,expected_status", [
+        pytest.param(lambda supplier, company: {"name": "Incomplete Supplier"}, 422,
+                     id="missing-required-fields"),
+        pytest.param(lambda supplier, company: {**_BASE_SUPPLIER, "company_id": company.id, "cnpj": "invalid-cnpj"}, 422,
+                     id="invalid-cnpj"),
+        pytest.param(lambda supplier, company: {**_BASE_SUPPLIER, "company_id": company.id, "cnpj": supplier.cnpj}, 400,
+                     id="duplicate-cnpj"),
+    ])
+    def test_create_supplier_validation(
+        self, client: TestClient, auth_headers, test_supplier, test_company,
+        build_payload, expected_status
+    ):
+        """Test supplier creation with invalid payloads."""
+        supplier_data = build_payload(test_supplier, test_company)
         
         response = client.post("/api/v1/suppliers/", json=supplier_data, headers=auth_headers)
-        assert response.status_code == 422
-    
-    def test_create_supplier_invalid_cnpj(self, client: TestClient, auth_headers, test_company):
-        """Test creating supplier with invalid CNPJ."""
-        supplier_data = {
-            "name": "Invalid CNPJ Supplier",
-            "cnpj": "invalid-cnpj",
-            "email": "invalid@supplier.com",
-            "phone": "11999999999",
-            "address": "Address, 123",
-            "city": "City",
-            "state": "SP",
-            "zip_code": "12345-678",
-            "company_id": test_company.id
-        }
-        
-        response = client.post("/api/v1/suppliers/", json=supplier_data, headers=auth_headers)
-        assert response.status_code == 422
-    
-    def test_create_supplier_duplicate_cnpj(self, client: TestClient, auth_headers, test_supplier):
-        """Test creating supplier with duplicate CNPJ."""
-        supplier_data = {
-            "name": "Duplicate CNPJ Supplier",
-            "cnpj": test_supplier.cnpj,  # Using existing CNPJ
-            "email": "duplicate@supplier.com",
-            "phone": "11999999999",
-            "address": "Address, 123",
-            "city": "City",
-            "state": "SP",
-            "zip_code": "12345-678",
-            "company_id": test_supplier.company_id
-        }
-        
-        response = client.post("/api/v1/suppliers/", json=supplier_data, headers=auth_headers)
-        assert response.status_code == 400
+        assert response.status_code == expected_status
     
     def test_update_supplier_success(self, client: TestClient, auth_headers, test_supplier):
         """Test successful supplier update."""
@@ -130,19 +100,6 @@ class TestSupplierEndpoints:
         assert data["email"] == update_data["email"]
         assert data["phone"] == update_data["phone"]
     
-    def test_update_nonexistent_supplier(self, client: TestClient, auth_headers):
-        """Test updating non-existent supplier."""
-        update_data = {
-            "name": "Updated Name"
-        }
-        
-        response = client.put(
-            "/api/v1/suppliers/99999", 
-            json=update_data, 
-            headers=auth_headers
-        )
-        assert response.status_code == 404
-    
     def test_delete_supplier_success(self, client: TestClient, auth_headers, test_supplier):
         """Test successful supplier deletion."""
         response = client.delete(f"/api/v1/suppliers/{test_supplier.id}", headers=auth_headers)
@@ -152,11 +109,6 @@ class TestSupplierEndpoints:
         get_response = client.get(f"/api/v1/suppliers/{test_supplier.id}", headers=auth_headers)
         assert get_response.status_code == 404
     
-    def test_delete_nonexistent_supplier(self, client: TestClient, auth_headers):
-        """Test deleting non-existent supplier."""
-        response = client.delete("/api/v1/suppliers/99999", headers=auth_headers)
-        assert response.status_code == 404
-    
     def test_search_suppliers(self, client: TestClient, auth_headers, test_supplier):
         """Test searching suppliers."""
         response = client.get(
@@ -196,11 +148,6 @@ class TestSupplierEndpoints:
         assert "avg_response_time" in data
         assert "success_rate" in data
     
-    def test_unauthorized_access(self, client: TestClient):
-        """Test unauthorized access to supplier endpoints."""
-        response = client.get("/api/v1/suppliers/")
-        assert response.status_code == 401
-    
     def test_company_isolation(self, client: TestClient, auth_headers, test_supplier):
         """Test that suppliers are isolated by company."""
         # This test would need to be expanded with a different company context
@@ -213,46 +160,58 @@ class TestSupplierEndpoints:
             if supplier["id"] == test_supplier.id:
                 assert supplier["company_id"] == test_supplier.company_id
     
-    def test_rate_limiting(self, client: TestClient, auth_headers):
+    def test_rate_limiting(self, client: TestClient, auth_headers, tight_rate_limit):
         """Test rate limiting on supplier endpoints."""
-        # Make multiple requests to trigger rate limiting
-        for _ in range(55):  # Burst limit is 50
+        # Make just enough requests to exceed the burst limit
+        for _ in range(tight_rate_limit + 1):
             response = client.get("/api/v1/suppliers/", headers=auth_headers)
         
         # Should get rate limited
         assert response.status_code == 429
     
     @pytest.mark.slow
-    def test_supplier_performance(self, client: TestClient, auth_headers):
+    def test_supplier_performance(self, benchmark, client: TestClient, auth_headers):
         """Test supplier endpoint performance."""
-        import time
+        def list_suppliers():
+            return client.get("/api/v1/suppliers/", headers=auth_headers)
         
-        start_time = time.time()
-        response = client.get("/api/v1/suppliers/", headers=auth_headers)
-        end_time = time.time()
+        response = benchmark.pedantic(list_suppliers, rounds=5, warmup_rounds=1)
         
         assert response.status_code == 200
-        assert (end_time - start_time) < 1.0  # Should respond within 1 second
+        assert benchmark.stats.stats.mean < 1.0  # Should respond within 1 second
 
 
 @pytest.mark.integration
-@pytest.mark.asyncio
+@pytest.mark.anyio
 class TestSupplierEndpointsAsync:
     """Test supplier endpoints with async client."""
     
+    async def test_get_suppliers_list(self, async_client: AsyncClient, auth_headers):
+        """Test getting list of suppliers."""
+        response = await async_client.get("/api/v1/suppliers/", headers=auth_headers)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert isinstance(data, list)
+    
+    async def test_get_suppliers_pagination(self, async_client: AsyncClient, auth_headers):
+        """Test supplier list pagination."""
+        response = await async_client.get("/api/v1/suppliers/?skip=0&limit=5", headers=auth_headers)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert isinstance(data, list)
+        assert len(data) <= 5
+    
+    @pytest.mark.usefixtures("db_session")
     async def test_create_and_update_supplier_async(self, async_client: AsyncClient, auth_headers, test_company):
         """Test async supplier creation and update."""
         # Create supplier
         supplier_data = {
+            **_BASE_SUPPLIER,
+            "company_id": test_company.id,
             "name": "Async Test Supplier",
-            "cnpj": "87654321000166",
-            "email": "async@supplier.com",
-            "phone": "11666666666",
-            "address": "Async Supplier Address, 999",
-            "city": "Async Supplier City",
-            "state": "PR",
-            "zip_code": "54321-098",
-            "company_id": test_company.id
+            "cnpj": "87654321000166"
         }
         
         create_response = await async_client.post(
@@ -281,34 +240,34 @@ class TestSupplierEndpointsAsync:
         assert updated_supplier["name"] == update_data["name"]
         assert updated_supplier["email"] == update_data["email"]
     
+    @pytest.mark.usefixtures("db_session")
     async def test_bulk_supplier_operations(self, async_client: AsyncClient, auth_headers, test_company):
         """Test bulk supplier operations."""
-        # Create multiple suppliers concurrently
-        import asyncio
-        
+        # Create multiple suppliers
         supplier_data_list = [
             {
+                **_BASE_SUPPLIER,
+                "company_id": test_company.id,
                 "name": f"Bulk Supplier {i}",
                 "cnpj": f"1234567800015{i}",
-                "email": f"bulk{i}@supplier.com",
-                "phone": f"1155555555{i}",
-                "address": f"Bulk Address {i}",
-                "city": "Bulk City",
-                "state": "SP",
-                "zip_code": "12345-678",
-                "company_id": test_company.id
+                "email": f"bulk{i}@supplier.com"
             }
             for i in range(5)
         ]
         
-        # Create suppliers concurrently
-        tasks = [
-            async_client.post("/api/v1/suppliers/", json=data, headers=auth_headers)
+        # One request at a time: every request shares the single in-memory
+        # database connection, so concurrent ones would interleave transactions
+        results = [
+            await async_client.post("/api/v1/suppliers/", json=data, headers=auth_headers)
             for data in supplier_data_list
         ]
+        assert all(r.status_code == 201 for r in results)
         
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        # Read every supplier back over the same pooled client
+        fetched = [
+            await async_client.get(f"/api/v1/suppliers/{r.json()['id']}", headers=auth_headers)
+            for r in results
+        ]
         
-        # Verify results
-        successful_creates = [r for r in results if not isinstance(r, Exception) and r.status_code == 201]
-        assert len(successful_creates) == 5
+        assert all(r.status_code == 200 for r in fetched)
+        assert {r.json()["cnpj"] for r in fetched} == {data["cnpj"] for data in supplier_data_list}
@@ -2,236 +2,244 @@
 Integration tests for tender management endpoints.
 """
 
+import tempfile
+import uuid
 import pytest
-from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, patch
+from freezegun import freeze_time
+from httpx import AsyncClient
 from tests.conftest import TestDataFactory
 
+# Keep the module on one xdist worker so its module- and class-scoped
+# tenders are created once rather than on every worker that gets a test
+pytestmark = [pytest.mark.anyio, pytest.mark.xdist_group("tender_endpoints")]
 
-class TestTenderEndpoints:
-    """Test tender management API endpoints."""
+# Valid tender payload; tests merge their overrides into a copy
+_BASE_TENDER = TestDataFactory.tender_create_data()
+
+# Search dataset covering the status, budget and deadline axes filtered on below
+_SEED_TENDERS = [
+    {
+        **_BASE_TENDER,
+        "title": f"Seeded Tender {i}",
+        "status": "open" if i % 2 == 0 else "closed",
+        "budget": 25000.0 * (i + 1),
+        "submission_deadline": "2025-06-30T23:59:59" if i % 3 else "2024-09-30T23:59:59"
+    }
+    for i in range(10)
+]
+
+# "Now" for every test here, so the fixed deadlines below stay in the future
+_FROZEN_NOW = "2024-06-01T12:00:00"
+
+
+@pytest.fixture(scope="module", autouse=True)
+def frozen_time(auth_headers, admin_headers):
+    """Pin the clock for the module, including its class- and module-scoped seeds.
+
+    Autouse because every tender the module creates, through a fixture or a
+    request, is checked against the clock. real_asyncio keeps the event loop
+    on the real monotonic clock. The session tokens are requested first so
+    they are signed on the real clock and stay valid for later modules.
+    """
+    with freeze_time(_FROZEN_NOW, real_asyncio=True) as frozen:
+        yield frozen
+
+
+@pytest.fixture
+def missing_tender_id():
+    """A well-formed tender id that no row has, looked up through the real CRUD."""
+    return str(uuid.uuid4())
+
+
+@pytest.fixture(scope="module")
+async def tenders_page(async_client: AsyncClient, auth_headers):
+    """First page of the tender list, fetched once for the read-only list tests."""
+    return await async_client.get("/api/v1/tenders/?skip=0&limit=5", headers=auth_headers)
+
+
+class TestTenderReadOnly:
+    """Test tender endpoints that only read."""
     
-    def test_get_tenders_list(self, client: TestClient, auth_headers):
+    async def test_get_tenders_list(self, tenders_page):
         """Test getting list of tenders."""
-        response = client.get("/api/v1/tenders/", headers=auth_headers)
-        
-        assert response.status_code == 200
-        data = response.json()
+        assert tenders_page.status_code == 200
+        data = tenders_page.json()
         assert isinstance(data, list)
     
-    def test_get_tenders_pagination(self, client: TestClient, auth_headers):
+    async def test_get_tenders_pagination(self, tenders_page):
         """Test tender list pagination."""
-        response = client.get("/api/v1/tenders/?skip=0&limit=5", headers=auth_headers)
-        
-        assert response.status_code == 200
-        data = response.json()
+        assert tenders_page.status_code == 200
+        data = tenders_page.json()
         assert isinstance(data, list)
         assert len(data) <= 5
     
-    def test_get_tender_by_id(self, client: TestClient, auth_headers, test_tender):
-        """Test getting specific tender by ID."""
-        response = client.get(f"/api/v1/tenders/{test_tender.id}", headers=auth_headers)
-        
-        assert response.status_code == 200
-        data = response.json()
-        assert data["id"] == test_tender.id
-        assert data["title"] == test_tender.title
-        assert data["description"] == test_tender.description
-    
-    def test_get_nonexistent_tender(self, client: TestClient, auth_headers):
+    async def test_get_nonexistent_tender(self, async_client: AsyncClient, auth_headers, missing_tender_id):
         """Test getting non-existent tender."""
-        response = client.get("/api/v1/tenders/nonexistent-id", headers=auth_headers)
+        response = await async_client.get(
+            f"/api/v1/tenders/{missing_tender_id}", headers=auth_headers
+        )
         
         assert response.status_code == 404
         assert "Tender not found" in response.json()["detail"]
+
+
+class TestTenderMutation:
+    """Test tender endpoints that write, each on its own rolled-back tender."""
     
-    def test_create_tender_success(self, client: TestClient, auth_headers):
-        """Test successful tender creation."""
-        tender_data = TestDataFactory.tender_create_data({
+    async def test_tender_lifecycle(self, async_client: AsyncClient, auth_headers, db_session):
+        """Test creating, reading, updating and deleting one tender in turn.
+
+        db_session routes every request through the per-test transaction, so
+        nothing the test creates outlives it.
+        """
+        tender_data = {
+            **_BASE_TENDER,
             "title": "New Tender",
             "description": "New tender description",
             "submission_deadline": "2024-12-31T23:59:59",
             "budget": 150000.0
-        })
+        }
         
-        response = client.post("/api/v1/tenders/", 
-                             json=tender_data, 
-                             headers=auth_headers)
+        response = await async_client.post(
+            "/api/v1/tenders/", json=tender_data, headers=auth_headers
+        )
         
         assert response.status_code == 201
+        created = response.json()
+        assert created["title"] == tender_data["title"]
+        assert created["description"] == tender_data["description"]
+        assert created["budget"] == tender_data["budget"]
+        assert created["status"] == "open"
+        tender_url = f"/api/v1/tenders/{created['id']}"
+        
+        response = await async_client.get(tender_url, headers=auth_headers)
+        
+        assert response.status_code == 200
         data = response.json()
+        assert data["id"] == created["id"]
         assert data["title"] == tender_data["title"]
         assert data["description"] == tender_data["description"]
-        assert data["budget"] == tender_data["budget"]
-        assert data["status"] == "open"
-    
-    def test_create_tender_missing_required_fields(self, client: TestClient, auth_headers):
-        """Test creating tender with missing required fields."""
-        tender_data = {
-            "description": "Missing title"
-        }
-        
-        response = client.post("/api/v1/tenders/", 
-                             json=tender_data, 
-                             headers=auth_headers)
-        
-        assert response.status_code == 422
-    
-    def test_create_tender_invalid_date_format(self, client: TestClient, auth_headers):
-        """Test creating tender with invalid date format."""
-        tender_data = TestDataFactory.tender_create_data({
-            "submission_deadline": "invalid-date-format"
-        })
-        
-        response = client.post("/api/v1/tenders/", 
-                             json=tender_data, 
-                             headers=auth_headers)
-        
-        assert response.status_code == 422
-    
-    def test_create_tender_past_deadline(self, client: TestClient, auth_headers):
-        """Test creating tender with past deadline."""
-        tender_data = TestDataFactory.tender_create_data({
-            "submission_deadline": "2020-01-01T00:00:00"  # Past date
-        })
         
-        response = client.post("/api/v1/tenders/", 
-                             json=tender_data, 
-                             headers=auth_headers)
-        
-        assert response.status_code == 400
-        assert "Deadline cannot be in the past" in response.json()["detail"]
-    
-    def test_create_tender_negative_budget(self, client: TestClient, auth_headers):
-        """Test creating tender with negative budget."""
-        tender_data = TestDataFactory.tender_create_data({
-            "budget": -1000.0
-        })
-        
-        response = client.post("/api/v1/tenders/", 
-                             json=tender_data, 
-                             headers=auth_headers)
-        
-        assert response.status_code == 422
-    
-    def test_update_tender_success(self, client: TestClient, auth_headers, test_tender):
-        """Test successful tender update."""
         update_data = {
             "title": "Updated Tender Title",
             "budget": 200000.0
         }
-        
-        response = client.put(f"/api/v1/tenders/{test_tender.id}", 
-                            json=update_data, 
-                            headers=auth_headers)
+        response = await async_client.put(tender_url, json=update_data, headers=auth_headers)
         
         assert response.status_code == 200
         data = response.json()
         assert data["title"] == "Updated Tender Title"
         assert data["budget"] == 200000.0
+        
+        response = await async_client.delete(tender_url, headers=auth_headers)
+        
+        assert response.status_code == 200
+        
+        # Verify tender is deleted
+        get_response = await async_client.get(tender_url, headers=auth_headers)
+        assert get_response.status_code == 404
     
-    def test_update_tender_status(self, client: TestClient, auth_headers, test_tender):
+    async def test_update_tender_status(self, async_client: AsyncClient, auth_headers, test_tender):
         """Test updating tender status."""
         update_data = {
             "status": "in_progress"
         }
         
-        response = client.put(f"/api/v1/tenders/{test_tender.id}", 
-                            json=update_data, 
-                            headers=auth_headers)
+        response = await async_client.put(
+            f"/api/v1/tenders/{test_tender.id}", json=update_data, headers=auth_headers
+        )
         
         assert response.status_code == 200
         data = response.json()
         assert data["status"] == "in_progress"
     
-    def test_update_tender_invalid_status(self, client: TestClient, auth_headers, test_tender):
-        """Test updating tender with invalid status."""
-        update_data = {
-            "status": "invalid_status"
-        }
-        
-        response = client.put(f"/api/v1/tenders/{test_tender.id}", 
-                            json=update_data, 
-                            headers=auth_headers)
-        
-        assert response.status_code == 422
-    
-    def test_update_nonexistent_tender(self, client: TestClient, auth_headers):
+    async def test_update_nonexistent_tender(self, async_client: AsyncClient, auth_headers, missing_tender_id):
         """Test updating non-existent tender."""
         update_data = {
             "title": "Updated Title"
         }
         
-        response = client.put("/api/v1/tenders/nonexistent-id", 
-                            json=update_data, 
-                            headers=auth_headers)
+        response = await async_client.put(
+            f"/api/v1/tenders/{missing_tender_id}", json=update_data, headers=auth_headers
+        )
         
         assert response.status_code == 404
     
-    def test_delete_tender(self, client: TestClient, auth_headers, test_tender):
-        """Test deleting tender."""
-        response = client.delete(f"/api/v1/tenders/{test_tender.id}", 
-                               headers=auth_headers)
-        
-        assert response.status_code == 200
-        
-        # Verify tender is deleted
-        get_response = client.get(f"/api/v1/tenders/{test_tender.id}", 
-                                headers=auth_headers)
-        assert get_response.status_code == 404
-    
-    def test_delete_nonexistent_tender(self, client: TestClient, auth_headers):
+    async def test_delete_nonexistent_tender(self, async_client: AsyncClient, auth_headers, missing_tender_id):
         """Test deleting non-existent tender."""
-        response = client.delete("/api/v1/tenders/nonexistent-id", 
-                               headers=auth_headers)
+        response = await async_client.delete(
+            f"/api/v1/tenders/{missing_tender_id}", headers=auth_headers
+        )
         
         assert response.status_code == 404
 
 
+@pytest.fixture(scope="class")
+async def seeded_tenders(async_client: AsyncClient, auth_headers):
+    """Create the search dataset once per class and delete it afterwards.
+
+    One request at a time: every request shares the single in-memory
+    database connection, so concurrent ones would interleave transactions.
+    """
+    tenders = []
+    for payload in _SEED_TENDERS:
+        response = await async_client.post("/api/v1/tenders/", json=payload, headers=auth_headers)
+        assert response.status_code == 201
+        tenders.append(response.json())
+    yield tenders
+    for tender in tenders:
+        await async_client.delete(f"/api/v1/tenders/{tender['id']}", headers=auth_headers)
+
+
 class TestTenderSearch:
     """Test tender search and filtering functionality."""
     
-    def test_search_tenders_by_title(self, client: TestClient, auth_headers, test_tender):
+    async def test_search_tenders_by_title(self, async_client: AsyncClient, auth_headers, seeded_tenders):
         """Test searching tenders by title."""
-        response = client.get(f"/api/v1/tenders/search?title={test_tender.title}", 
-                            headers=auth_headers)
+        title = seeded_tenders[3]["title"]
+        response = await async_client.get(
+            "/api/v1/tenders/search", params={"title": title}, headers=auth_headers
+        )
         
         assert response.status_code == 200
         data = response.json()
         assert len(data) >= 1
-        assert any(tender["title"] == test_tender.title for tender in data)
-    
-    def test_filter_tenders_by_status(self, client: TestClient, auth_headers):
-        """Test filtering tenders by status."""
-        response = client.get("/api/v1/tenders/?status=open", 
-                            headers=auth_headers)
+        assert any(tender["title"] == title for tender in data)
+    
+    async def test_filter_tenders(self, async_client: AsyncClient, auth_headers, seeded_tenders):
+        """Test filtering tenders by status, budget range and deadline in one request."""
+        response = await async_client.get(
+            "/api/v1/tenders/",
+            params={
+                "status": "open",
+                "min_budget": 50000,
+                "max_budget": 200000,
+                "deadline_after": "2025-01-01"
+            },
+            headers=auth_headers
+        )
         
         assert response.status_code == 200
         data = response.json()
         assert all(tender["status"] == "open" for tender in data)
-    
-    def test_filter_tenders_by_budget_range(self, client: TestClient, auth_headers):
-        """Test filtering tenders by budget range."""
-        response = client.get("/api/v1/tenders/?min_budget=50000&max_budget=200000", 
-                            headers=auth_headers)
-        
-        assert response.status_code == 200
-        data = response.json()
         assert all(50000 <= tender["budget"] <= 200000 for tender in data if tender["budget"])
+        assert all(tender["submission_deadline"] >= "2025-01-01" for tender in data)
+        
+        # Every seeded tender matching all three filters comes back
+        expected = {
+            tender["id"] for tender in seeded_tenders
+            if tender["status"] == "open"
+            and 50000 <= tender["budget"] <= 200000
+            and tender["submission_deadline"] >= "2025-01-01"
+        }
+        assert expected <= {tender["id"] for tender in data}
     
-    def test_filter_tenders_by_deadline(self, client: TestClient, auth_headers):
-        """Test filtering tenders by deadline."""
-        response = client.get("/api/v1/tenders/?deadline_after=2024-01-01", 
-                            headers=auth_headers)
-        
-        assert response.status_code == 200
-        data = response.json()
-        # All returned tenders should have deadlines after 2024-01-01
-        assert len(data) >= 0  # Could be empty if no tenders match
-    
-    def test_search_tenders_no_results(self, client: TestClient, auth_headers):
+    async def test_search_tenders_no_results(self, async_client: AsyncClient, auth_headers):
         """Test tender search with no results."""
-        response = client.get("/api/v1/tenders/search?title=NonexistentTender", 
-                            headers=auth_headers)
+        response = await async_client.get(
+            "/api/v1/tenders/search?title=NonexistentTender", headers=auth_headers
+        )
         
         assert response.status_code == 200
         data = response.json()
@@ -241,65 +249,87 @@ class TestTenderSearch:
 class TestTenderAIProcessing:
     """Test AI processing functionality for tenders."""
     
-    def test_process_tender_document(self, client: TestClient, auth_headers, test_tender, mock_ai_service):
+    @pytest.fixture
+    def mock_ai_service(self):
+        """Stub the AI service the router hands documents to, so no worker runs.
+
+        Only uploads that pass validation reach the service, so tests that
+        get that far request it explicitly.
+        """
+        with patch("app.api.v1.endpoints.tenders.AIService") as ai_service_class:
+            ai_service = ai_service_class.return_value
+            ai_service.process_tender_document = AsyncMock(
+                return_value={"job_id": "fixed", "status": "queued"}
+            )
+            yield ai_service
+    
+    async def test_process_tender_document(self, async_client: AsyncClient, auth_headers, test_tender, mock_ai_service):
         """Test AI processing of tender document."""
         # Mock file upload
         files = {
             "file": ("test_document.pdf", b"fake pdf content", "application/pdf")
         }
         
-        response = client.post(f"/api/v1/tenders/{test_tender.id}/process-ai", 
-                             files=files, 
-                             headers=auth_headers)
+        response = await async_client.post(
+            f"/api/v1/tenders/{test_tender.id}/process-ai", files=files, headers=auth_headers
+        )
         
         assert response.status_code == 200
         data = response.json()
         assert "job_id" in data
         assert data["status"] == "queued"
     
-    def test_process_tender_unsupported_file_type(self, client: TestClient, auth_headers, test_tender):
+    async def test_process_tender_unsupported_file_type(
+        self, async_client: AsyncClient, auth_headers, readonly_tender
+    ):
         """Test AI processing with unsupported file type."""
         files = {
             "file": ("test_file.txt", b"text content", "text/plain")
         }
         
-        response = client.post(f"/api/v1/tenders/{test_tender.id}/process-ai", 
-                             files=files, 
-                             headers=auth_headers)
+        response = await async_client.post(
+            f"/api/v1/tenders/{readonly_tender.id}/process-ai", files=files, headers=auth_headers
+        )
         
         assert response.status_code == 400
         assert "Unsupported file type" in response.json()["detail"]
     
-    def test_process_tender_file_too_large(self, client: TestClient, auth_headers, test_tender):
+    async def test_process_tender_file_too_large(
+        self, async_client: AsyncClient, auth_headers, readonly_tender
+    ):
         """Test AI processing with file too large."""
-        # Create a large file content (mock)
-        large_content = b"x" * (51 * 1024 * 1024)  # 51MB
-        
-        files = {
-            "file": ("large_file.pdf", large_content, "application/pdf")
-        }
-        
-        response = client.post(f"/api/v1/tenders/{test_tender.id}/process-ai", 
-                             files=files, 
-                             headers=auth_headers)
+        # A sparse 51MB file: httpx streams it in chunks, so it is never held in memory
+        with tempfile.TemporaryFile() as large_file:
+            large_file.truncate(51 * 1024 * 1024)
+            files = {
+                "file": ("large_file.pdf", large_file, "application/pdf")
+            }
+            
+            response = await async_client.post(
+                f"/api/v1/tenders/{readonly_tender.id}/process-ai",
+                files=files,
+                headers=auth_headers
+            )
         
         assert response.status_code == 400
         assert "File too large" in response.json()["detail"]
     
-    def test_get_ai_processing_status(self, client: TestClient, auth_headers):
+    async def test_get_ai_processing_status(self, async_client: AsyncClient, auth_headers):
         """Test getting AI processing job status."""
         job_id = "test-job-id"
         
-        response = client.get(f"/api/v1/tenders/ai-jobs/{job_id}", 
-                            headers=auth_headers)
+        response = await async_client.get(f"/api/v1/tenders/ai-jobs/{job_id}", headers=auth_headers)
         
         # This might return 404 if job doesn't exist, which is fine for testing
         assert response.status_code in [200, 404]
     
-    def test_get_ai_processing_results(self, client: TestClient, auth_headers, test_tender):
+    async def test_get_ai_processing_results(
+        self, async_client: AsyncClient, auth_headers, readonly_tender
+    ):
         """Test getting AI processing results for a tender."""
-        response = client.get(f"/api/v1/tenders/{test_tender.id}/ai-results", 
-                            headers=auth_headers)
+        response = await async_client.get(
+            f"/api/v1/tenders/{readonly_tender.id}/ai-results", headers=auth_headers
+        )
         
         assert response.status_code == 200
         data = response.json()
@@ -307,11 +337,16 @@ class TestTenderAIProcessing:
 
 
 class TestTenderStatistics:
-    """Test tender statistics endpoints."""
+    """Test tender statistics endpoints.
+
+    The counts cover every tender in the worker's database, so the class
+    relies on the module's xdist group to run on the same worker as the
+    tenders the rest of the module creates.
+    """
     
-    def test_get_tender_statistics(self, client: TestClient, auth_headers):
+    async def test_get_tender_statistics(self, async_client: AsyncClient, auth_headers):
         """Test getting tender statistics."""
-        response = client.get("/api/v1/tenders/statistics", headers=auth_headers)
+        response = await async_client.get("/api/v1/tenders/statistics", headers=auth_headers)
         
         assert response.status_code == 200
         data = response.json()
@@ -320,20 +355,22 @@ class TestTenderStatistics:
         assert "closed_tenders" in data
         assert "average_budget" in data
     
-    def test_get_tender_statistics_by_period(self, client: TestClient, auth_headers):
+    async def test_get_tender_statistics_by_period(self, async_client: AsyncClient, auth_headers):
         """Test getting tender statistics for specific period."""
-        response = client.get("/api/v1/tenders/statistics?period=month", 
-                            headers=auth_headers)
+        response = await async_client.get(
+            "/api/v1/tenders/statistics?period=month", headers=auth_headers
+        )
         
         assert response.status_code == 200
         data = response.json()
         assert "period" in data
         assert "statistics" in data
     
-    def test_get_tender_status_distribution(self, client: TestClient, auth_headers):
+    async def test_get_tender_status_distribution(self, async_client: AsyncClient, auth_headers):
         """Test getting tender status distribution."""
-        response = client.get("/api/v1/tenders/status-distribution", 
-                            headers=auth_headers)
+        response = await async_client.get(
+            "/api/v1/tenders/status-distribution", headers=auth_headers
+        )
         
         assert response.status_code == 200
         data = response.json()
@@ -344,74 +381,69 @@ class TestTenderStatistics:
 class TestTenderPermissions:
     """Test tender access permissions."""
     
-    def test_access_tender_from_different_company(self, client: TestClient, auth_headers):
-        """Test accessing tender from different company."""
-        # This would require creating a user from a different company
-        # For now, we'll test the concept
-        response = client.get("/api/v1/tenders/other-company-tender-id", 
-                            headers=auth_headers)
-        
-        # Should return 404 (not found) or 403 (forbidden)
-        assert response.status_code in [404, 403]
-    
-    def test_create_tender_without_auth(self, client: TestClient):
-        """Test creating tender without authentication."""
-        tender_data = TestDataFactory.tender_create_data()
-        
-        response = client.post("/api/v1/tenders/", json=tender_data)
-        
-        assert response.status_code == 401
-    
-    def test_update_tender_without_auth(self, client: TestClient, test_tender):
-        """Test updating tender without authentication."""
-        update_data = {"title": "Updated Title"}
-        
-        response = client.put(f"/api/v1/tenders/{test_tender.id}", json=update_data)
-        
-        assert response.status_code == 401
-    
-    def test_delete_tender_without_auth(self, client: TestClient, test_tender):
-        """Test deleting tender without authentication."""
-        response = client.delete(f"/api/v1/tenders/{test_tender.id}")
-        
-        assert response.status_code == 401
+    @pytest.mark.parametrize("method,url,body,authenticated,expected_statuses", [
+        # A tender outside the user's company is either hidden or forbidden
+        pytest.param("get", "/api/v1/tenders/other-company-tender-id", None, True, (404, 403),
+                     id="other-company"),
+        pytest.param("post", "/api/v1/tenders/", _BASE_TENDER, False, (401,),
+                     id="create-without-auth"),
+        pytest.param("put", "/api/v1/tenders/{id}", {"title": "Updated Title"}, False, (401,),
+                     id="update-without-auth"),
+        pytest.param("delete", "/api/v1/tenders/{id}", None, False, (401,),
+                     id="delete-without-auth"),
+    ])
+    async def test_tender_access(
+        self, async_client: AsyncClient, auth_headers, readonly_tender,
+        method, url, body, authenticated, expected_statuses
+    ):
+        """Test tender access across companies and without authentication."""
+        response = await async_client.request(
+            method,
+            url.format(id=readonly_tender.id),
+            json=body,
+            headers=auth_headers if authenticated else None
+        )
+        
+        assert response.status_code in expected_statuses
 
 
 class TestTenderValidation:
     """Test input validation for tender endpoints."""
     
-    def test_create_tender_empty_title(self, client: TestClient, auth_headers):
-        """Test creating tender with empty title."""
-        tender_data = TestDataFactory.tender_create_data({
-            "title": ""
-        })
-        
-        response = client.post("/api/v1/tenders/", 
-                             json=tender_data, 
-                             headers=auth_headers)
-        
-        assert response.status_code == 422
-    
-    def test_create_tender_very_long_title(self, client: TestClient, auth_headers):
-        """Test creating tender with very long title."""
-        tender_data = TestDataFactory.tender_create_data({
-            "title": "a" * 1000  # Very long title
-        })
-        
-        response = client.post("/api/v1/tenders/", 
-                             json=tender_data, 
-                             headers=auth_headers)
-        
-        assert response.status_code == 422
-    
-    def test_update_tender_invalid_budget_type(self, client: TestClient, auth_headers, test_tender):
-        """Test updating tender with invalid budget type."""
-        update_data = {
-            "budget": "not-a-number"
-        }
-        
-        response = client.put(f"/api/v1/tenders/{test_tender.id}", 
-                            json=update_data, 
-                            headers=auth_headers)
+    @pytest.mark.parametrize("payload,expected_status,expected_detail", [
+        pytest.param({"description": "Missing title"}, 422, None,
+                     id="missing-required-fields"),
+        pytest.param({**_BASE_TENDER, "submission_deadline": "invalid-date-format"},
+                     422, None, id="invalid-date-format"),
+        pytest.param({**_BASE_TENDER, "submission_deadline": "2023-01-01T00:00:00"},
+                     400, "Deadline cannot be in the past", id="past-deadline"),
+        pytest.param({**_BASE_TENDER, "budget": -1000.0}, 422, None,
+                     id="negative-budget"),
+        pytest.param({**_BASE_TENDER, "title": ""}, 422, None,
+                     id="empty-title"),
+        pytest.param({**_BASE_TENDER, "title": "a" * 1000}, 422, None,
+                     id="very-long-title"),
+    ])
+    async def test_create_tender_validation(
+        self, async_client: AsyncClient, auth_headers, payload, expected_status, expected_detail
+    ):
+        """Test tender creation with invalid payloads."""
+        response = await async_client.post("/api/v1/tenders/", json=payload, headers=auth_headers)
+        
+        assert response.status_code == expected_status
+        if expected_detail:
+            assert expected_detail in response.json()["detail"]
+    
+    @pytest.mark.parametrize("update_data", [
+        pytest.param({"status": "invalid_status"}, id="invalid-status"),
+        pytest.param({"budget": "not-a-number"}, id="invalid-budget-type"),
+    ])
+    async def test_update_tender_validation(
+        self, async_client: AsyncClient, auth_headers, readonly_tender, update_data
+    ):
+        """Test tender update with invalid payloads."""
+        response = await async_client.put(
+            f"/api/v1/tenders/{readonly_tender.id}", json=update_data, headers=auth_headers
+        )
         
         assert response.status_code == 422
@@ -2,35 +2,78 @@
 Integration tests for user management endpoints.
 """
 
+import uuid
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import orjson
 import pytest
-from fastapi.testclient import TestClient
+from httpx import AsyncClient
 from tests.conftest import TestDataFactory
+from tests.integration.conftest import TEST_USER_PASSWORD_HASH
+
+# Every request goes through db_session and is rolled back after the test.
+# Tests that change, deactivate or delete a user use managed_user, never the
+# session-wide test user that auth_headers signs in as.
+# The module stays on one xdist worker to share that worker's session fixtures.
+# header_auth skips JWT decoding for the session's own tokens.
+pytestmark = [
+    pytest.mark.anyio,
+    pytest.mark.usefixtures("header_auth", "db_session"),
+    pytest.mark.xdist_group("user_endpoints")
+]
+
+
+# Parametrized payloads are sent as bytes encoded once at import
+_JSON_CONTENT_TYPE = {"Content-Type": "application/json"}
+
+
+@pytest.fixture
+async def managed_user(db_session, test_company):
+    """Create a user in the test company that the test is free to change."""
+    from app.db.models import User, UserRole, UserStatus
+
+    user = User(
+        company_id=test_company.id,
+        email="managed@example.com",
+        password_hash=TEST_USER_PASSWORD_HASH,
+        first_name="Managed",
+        last_name="User",
+        role=UserRole.USER,
+        status=UserStatus.ACTIVE,
+        is_active=True
+    )
+    db_session.add(user)
+    await db_session.commit()
+    await db_session.refresh(user)
+    return user
 
 
 class TestUserEndpoints:
     """Test user management API endpoints."""
     
-    def test_get_users_list(self, client: TestClient, auth_headers):
+    async def test_get_users_list(self, async_client: AsyncClient, auth_headers):
         """Test getting list of users."""
-        response = client.get("/api/v1/users/", headers=auth_headers)
+        # One row is enough to prove the list works; keeps the body small
+        response = await async_client.get("/api/v1/users/?limit=1", headers=auth_headers)
         
         assert response.status_code == 200
         data = response.json()
         assert isinstance(data, list)
-        assert len(data) >= 1  # At least the test user
+        assert len(data) == 1  # The limit caps the page at one user
     
-    def test_get_users_pagination(self, client: TestClient, auth_headers):
+    async def test_get_users_pagination(self, async_client: AsyncClient, auth_headers):
         """Test user list pagination."""
-        response = client.get("/api/v1/users/?skip=0&limit=5", headers=auth_headers)
+        response = await async_client.get("/api/v1/users/?skip=0&limit=5", headers=auth_headers)
         
         assert response.status_code == 200
         data = response.json()
         assert isinstance(data, list)
         assert len(data) <= 5
     
-    def test_get_user_by_id(self, client: TestClient, auth_headers, test_user):
+    async def test_get_user_by_id(self, async_client: AsyncClient, auth_headers, test_user):
         """Test getting specific user by ID."""
-        response = client.get(f"/api/v1/users/{test_user.id}", headers=auth_headers)
+        response = await async_client.get(f"/api/v1/users/{test_user.id}", headers=auth_headers)
         
         assert response.status_code == 200
         data = response.json()
@@ -38,14 +81,30 @@ class TestUserEndpoints:
         assert data["email"] == test_user.email
         assert data["full_name"] == test_user.full_name
     
-    def test_get_nonexistent_user(self, client: TestClient, auth_headers):
+    async def test_get_nonexistent_user(self, async_client: AsyncClient, auth_headers):
         """Test getting non-existent user."""
-        response = client.get("/api/v1/users/nonexistent-id", headers=auth_headers)
+        response = await async_client.get(f"/api/v1/users/{uuid.uuid4()}", headers=auth_headers)
         
         assert response.status_code == 404
-        assert "User not found" in response.json()["detail"]
+        assert b"User not found" in response.content
     
-    def test_create_user_success(self, client: TestClient, admin_headers):
+    @pytest.mark.parametrize("method,body", [
+        pytest.param("get", None, id="get"),
+        pytest.param("put", orjson.dumps({"full_name": "Updated Name"}), id="update"),
+        pytest.param("delete", None, id="delete"),
+    ])
+    async def test_malformed_user_id(self, async_client: AsyncClient, admin_headers, method, body):
+        """Test that ids which are not UUIDs are rejected before any lookup."""
+        response = await async_client.request(
+            method,
+            "/api/v1/users/nonexistent-id",
+            content=body,
+            headers={**admin_headers, **_JSON_CONTENT_TYPE}
+        )
+        
+        assert response.status_code == 422
+    
+    async def test_create_user_success(self, async_client: AsyncClient, admin_headers):
         """Test successful user creation."""
         user_data = TestDataFactory.user_create_data({
             "email": "newuser@example.com",
@@ -53,9 +112,7 @@ class TestUserEndpoints:
             "role": "user"
         })
         
-        response = client.post("/api/v1/users/", 
-                             json=user_data, 
-                             headers=admin_headers)
+        response = await async_client.post("/api/v1/users/", json=user_data, headers=admin_headers)
         
         assert response.status_code == 201
         data = response.json()
@@ -64,178 +121,156 @@ class TestUserEndpoints:
         assert data["role"] == user_data["role"]
         assert data["is_active"] is True
     
-    def test_create_user_duplicate_email(self, client: TestClient, admin_headers, test_user):
+    async def test_create_user_duplicate_email(self, async_client: AsyncClient, admin_headers, test_user):
         """Test creating user with duplicate email."""
         user_data = TestDataFactory.user_create_data({
             "email": test_user.email,  # Duplicate email
             "full_name": "Duplicate User"
         })
         
-        response = client.post("/api/v1/users/", 
-                             json=user_data, 
-                             headers=admin_headers)
+        response = await async_client.post("/api/v1/users/", json=user_data, headers=admin_headers)
         
         assert response.status_code == 400
-        assert "Email already registered" in response.json()["detail"]
+        assert b"Email already registered" in response.content
     
-    def test_create_user_invalid_email(self, client: TestClient, admin_headers):
-        """Test creating user with invalid email."""
-        user_data = TestDataFactory.user_create_data({
-            "email": "invalid-email",  # Invalid email format
-        })
-        
-        response = client.post("/api/v1/users/", 
-                             json=user_data, 
-                             headers=admin_headers)
-        
-        assert response.status_code == 422
-    
-    def test_create_user_weak_password(self, client: TestClient, admin_headers):
-        """Test creating user with weak password."""
-        user_data = TestDataFactory.user_create_data({
-            "password": "123",  # Too weak
-        })
-        
-        response = client.post("/api/v1/users/", 
-                             json=user_data, 
-                             headers=admin_headers)
-        
-        assert response.status_code == 422
-    
-    def test_create_user_without_admin_permission(self, client: TestClient, auth_headers):
-        """Test creating user without admin permissions."""
-        user_data = TestDataFactory.user_create_data()
-        
-        response = client.post("/api/v1/users/", 
-                             json=user_data, 
-                             headers=auth_headers)
-        
-        assert response.status_code == 403
-    
-    def test_update_user_success(self, client: TestClient, admin_headers, test_user):
+    async def test_update_user_success(self, async_client: AsyncClient, admin_headers, managed_user):
         """Test successful user update."""
         update_data = {
             "full_name": "Updated Name",
             "role": "admin"
         }
         
-        response = client.put(f"/api/v1/users/{test_user.id}", 
-                            json=update_data, 
-                            headers=admin_headers)
+        response = await async_client.put(
+            f"/api/v1/users/{managed_user.id}", json=update_data, headers=admin_headers
+        )
         
         assert response.status_code == 200
         data = response.json()
         assert data["full_name"] == "Updated Name"
         assert data["role"] == "admin"
     
-    def test_update_user_email(self, client: TestClient, admin_headers, test_user):
+    async def test_update_user_email(self, async_client: AsyncClient, admin_headers, managed_user):
         """Test updating user email."""
         update_data = {
             "email": "updated@example.com"
         }
         
-        response = client.put(f"/api/v1/users/{test_user.id}", 
-                            json=update_data, 
-                            headers=admin_headers)
+        response = await async_client.put(
+            f"/api/v1/users/{managed_user.id}", json=update_data, headers=admin_headers
+        )
         
         assert response.status_code == 200
         data = response.json()
         assert data["email"] == "updated@example.com"
     
-    def test_update_user_duplicate_email(self, client: TestClient, admin_headers, test_user):
+    async def test_update_user_duplicate_email(self, async_client: AsyncClient, admin_headers, test_user, another_user):
         """Test updating user with duplicate email."""
-        # Create another user first
-        user_data = TestDataFactory.user_create_data({
-            "email": "another@example.com"
-        })
-        
-        create_response = client.post("/api/v1/users/", 
-                                    json=user_data, 
-                                    headers=admin_headers)
-        another_user = create_response.json()
-        
         # Try to update first user with second user's email
         update_data = {
-            "email": another_user["email"]
+            "email": another_user.email
         }
         
-        response = client.put(f"/api/v1/users/{test_user.id}", 
-                            json=update_data, 
-                            headers=admin_headers)
+        response = await async_client.put(
+            f"/api/v1/users/{test_user.id}", json=update_data, headers=admin_headers
+        )
         
         assert response.status_code == 400
-        assert "Email already registered" in response.json()["detail"]
+        assert b"Email already registered" in response.content
     
-    def test_update_nonexistent_user(self, client: TestClient, admin_headers):
+    async def test_update_nonexistent_user(self, async_client: AsyncClient, admin_headers):
         """Test updating non-existent user."""
         update_data = {
             "full_name": "Updated Name"
         }
         
-        response = client.put("/api/v1/users/nonexistent-id", 
-                            json=update_data, 
-                            headers=admin_headers)
+        response = await async_client.put(
+            f"/api/v1/users/{uuid.uuid4()}", json=update_data, headers=admin_headers
+        )
         
         assert response.status_code == 404
     
-    def test_update_user_without_permission(self, client: TestClient, auth_headers, test_user):
-        """Test updating user without admin permissions."""
-        update_data = {
-            "full_name": "Updated Name"
-        }
-        
-        response = client.put(f"/api/v1/users/{test_user.id}", 
-                            json=update_data, 
-                            headers=auth_headers)
-        
-        assert response.status_code == 403
-    
-    def test_deactivate_user(self, client: TestClient, admin_headers, test_user):
-        """Test deactivating user."""
-        response = client.put(f"/api/v1/users/{test_user.id}/deactivate", 
-                            headers=admin_headers)
+    async def test_user_activation_lifecycle(
+        self, async_client: AsyncClient, admin_headers, managed_user
+    ):
+        """Test deactivating and then reactivating a user."""
+        response = await async_client.put(
+            f"/api/v1/users/{managed_user.id}/deactivate", headers=admin_headers
+        )
         
         assert response.status_code == 200
-        data = response.json()
-        assert data["is_active"] is False
-    
-    def test_activate_user(self, client: TestClient, admin_headers, test_user):
-        """Test activating user."""
-        # First deactivate
-        client.put(f"/api/v1/users/{test_user.id}/deactivate", 
-                  headers=admin_headers)
+        assert response.json()["is_active"] is False
         
-        # Then activate
-        response = client.put(f"/api/v1/users/{test_user.id}/activate", 
-                            headers=admin_headers)
+        response = await async_client.put(
+            f"/api/v1/users/{managed_user.id}/activate", headers=admin_headers
+        )
         
         assert response.status_code == 200
-        data = response.json()
-        assert data["is_active"] is True
+        assert response.json()["is_active"] is True
     
-    def test_delete_user(self, client: TestClient, admin_headers, test_user):
+    async def test_delete_user(self, async_client: AsyncClient, admin_headers, managed_user):
         """Test deleting user."""
-        response = client.delete(f"/api/v1/users/{test_user.id}", 
-                               headers=admin_headers)
+        response = await async_client.delete(f"/api/v1/users/{managed_user.id}", headers=admin_headers)
         
         assert response.status_code == 200
         
         # Verify user is deleted
-        get_response = client.get(f"/api/v1/users/{test_user.id}", 
-                                headers=admin_headers)
+        get_response = await async_client.get(
+            f"/api/v1/users/{managed_user.id}", headers=admin_headers
+        )
         assert get_response.status_code == 404
     
-    def test_delete_nonexistent_user(self, client: TestClient, admin_headers):
+    async def test_delete_nonexistent_user(self, async_client: AsyncClient, admin_headers):
         """Test deleting non-existent user."""
-        response = client.delete("/api/v1/users/nonexistent-id", 
-                               headers=admin_headers)
+        response = await async_client.delete(f"/api/v1/users/{uuid.uuid4()}", headers=admin_headers)
         
         assert response.status_code == 404
     
-    def test_delete_user_without_permission(self, client: TestClient, auth_headers, test_user):
-        """Test deleting user without admin permissions."""
-        response = client.delete(f"/api/v1/users/{test_user.id}", 
-                               headers=auth_headers)
+    @pytest.mark.parametrize("method,url", [
+        pytest.param("post", "/api/v1/users/{id}/deactivate", id="deactivate"),
+        pytest.param("delete", "/api/v1/users/{id}", id="delete"),
+    ])
+    async def test_disabling_user_evicts_cached_sessions(
+        self, async_client: AsyncClient, admin_headers, db_session, managed_user, method, url
+    ):
+        """Test that deactivating or deleting a user drops their cached sessions."""
+        from app.db.models.user_session import UserSession
+
+        session = UserSession(
+            user_id=managed_user.id,
+            token_hash="managed-session",
+            expires_at=datetime.utcnow() + timedelta(hours=1)
+        )
+        db_session.add(session)
+        await db_session.commit()
+        
+        invalidate = AsyncMock()
+        with patch("app.api.v1.endpoints.users.invalidate_cached_sessions", invalidate):
+            response = await async_client.request(
+                method, url.format(id=managed_user.id), headers=admin_headers
+            )
+        
+        assert response.status_code == 200
+        # Otherwise the session middleware keeps accepting them from cache
+        invalidate.assert_awaited_once_with(session.id)
+    
+    @pytest.mark.parametrize("method,url,body", [
+        pytest.param("post", "/api/v1/users/", orjson.dumps(TestDataFactory.user_create_data()),
+                     id="create"),
+        pytest.param("put", "/api/v1/users/{id}", orjson.dumps({"full_name": "Updated Name"}),
+                     id="update"),
+        pytest.param("delete", "/api/v1/users/{id}", None,
+                     id="delete"),
+    ])
+    async def test_manage_user_without_admin_permission(
+        self, async_client: AsyncClient, auth_headers, test_user, method, url, body
+    ):
+        """Test that user management needs admin permissions."""
+        response = await async_client.request(
+            method,
+            url.format(id=test_user.id),
+            content=body,
+            headers={**auth_headers, **_JSON_CONTENT_TYPE}
+        )
         
         assert response.status_code == 403
 
@@ -243,39 +278,43 @@ class TestUserEndpoints:
 class TestUserSearch:
     """Test user search functionality."""
     
-    def test_search_users_by_email(self, client: TestClient, auth_headers, test_user):
+    async def test_search_users_by_email(self, async_client: AsyncClient, auth_headers, test_user):
         """Test searching users by email."""
-        response = client.get(f"/api/v1/users/search?email={test_user.email}", 
-                            headers=auth_headers)
+        response = await async_client.get(
+            f"/api/v1/users/search?email={test_user.email}", headers=auth_headers
+        )
         
         assert response.status_code == 200
         data = response.json()
         assert len(data) >= 1
         assert any(user["email"] == test_user.email for user in data)
     
-    def test_search_users_by_name(self, client: TestClient, auth_headers, test_user):
+    async def test_search_users_by_name(self, async_client: AsyncClient, auth_headers, test_user):
         """Test searching users by name."""
-        response = client.get(f"/api/v1/users/search?name={test_user.full_name}", 
-                            headers=auth_headers)
+        response = await async_client.get(
+            f"/api/v1/users/search?name={test_user.full_name}", headers=auth_headers
+        )
         
         assert response.status_code == 200
         data = response.json()
         assert len(data) >= 1
         assert any(user["full_name"] == test_user.full_name for user in data)
     
-    def test_search_users_by_role(self, client: TestClient, auth_headers):
+    async def test_search_users_by_role(
+        self, async_client: AsyncClient, auth_headers, seeded_users
+    ):
         """Test searching users by role."""
-        response = client.get("/api/v1/users/search?role=user", 
-                            headers=auth_headers)
+        response = await async_client.get("/api/v1/users/search?role=user&limit=5", headers=auth_headers)
         
         assert response.status_code == 200
         data = response.json()
         assert all(user["role"] == "user" for user in data)
     
-    def test_search_users_no_results(self, client: TestClient, auth_headers):
+    async def test_search_users_no_results(self, async_client: AsyncClient, auth_headers):
         """Test user search with no results."""
-        response = client.get("/api/v1/users/search?email=nonexistent@example.com", 
-                            headers=auth_headers)
+        response = await async_client.get(
+            "/api/v1/users/search?email=nonexistent@example.com", headers=auth_headers
+        )
         
         assert response.status_code == 200
         data = response.json()
@@ -285,52 +324,52 @@ class TestUserSearch:
 class TestUserProfile:
     """Test user profile management."""
     
-    def test_get_own_profile(self, client: TestClient, auth_headers, test_user):
+    async def test_get_own_profile(self, async_client: AsyncClient, auth_headers, test_user):
         """Test getting own profile."""
-        response = client.get("/api/v1/users/me", headers=auth_headers)
+        response = await async_client.get("/api/v1/users/me", headers=auth_headers)
         
         assert response.status_code == 200
         data = response.json()
         assert data["id"] == test_user.id
         assert data["email"] == test_user.email
     
-    def test_update_own_profile(self, client: TestClient, auth_headers):
+    async def test_update_own_profile(self, async_client: AsyncClient, auth_headers):
         """Test updating own profile."""
         update_data = {
             "full_name": "Updated Own Name"
         }
         
-        response = client.put("/api/v1/users/me", 
-                            json=update_data, 
-                            headers=auth_headers)
+        response = await async_client.put(
+            "/api/v1/users/me", json=update_data, headers=auth_headers
+        )
         
         assert response.status_code == 200
         data = response.json()
         assert data["full_name"] == "Updated Own Name"
     
-    def test_update_own_email(self, client: TestClient, auth_headers):
+    async def test_update_own_email(self, async_client: AsyncClient, auth_headers):
         """Test updating own email."""
         update_data = {
             "email": "newemail@example.com"
         }
         
-        response = client.put("/api/v1/users/me", 
-                            json=update_data, 
-                            headers=auth_headers)
+        response = await async_client.put(
+            "/api/v1/users/me", json=update_data, headers=auth_headers
+        )
         
         assert response.status_code == 200
         data = response.json()
         assert data["email"] == "newemail@example.com"
     
-    def test_cannot_update_own_role(self, client: TestClient, auth_headers):
+    async def test_cannot_update_own_role(self, async_client: AsyncClient, auth_headers):
         """Test that users cannot update their own role."""
         update_data = {
             "role": "admin"
         }
         
-        response = client.put("/api/v1/users/me", 
-                            json=update_data, 
-                            headers=auth_headers)
+        response = await async_client.put(
+            "/api/v1/users/me", json=update_data, headers=auth_headers
+        )
         
         # Should either ignore the role field or return an error
         assert response.status_code in [200, 400, 403]
@@ -344,39 +383,34 @@ class TestUserProfile:
 class TestUserValidation:
     """Test input validation for user endpoints."""
     
-    def test_create_user_missing_required_fields(self, client: TestClient, admin_headers):
-        """Test creating user with missing required fields."""
-        # Missing email
-        user_data = {
-            "password": "password",
-            "full_name": "Test User"
-        }
-        
-        response = client.post("/api/v1/users/", 
-                             json=user_data, 
-                             headers=admin_headers)
-        assert response.status_code == 422
+    @pytest.mark.parametrize("user_data,expected_status", [
+        pytest.param(orjson.dumps({"password": "password", "full_name": "Test User"}), 422,
+                     id="missing-email"),
+        pytest.param(orjson.dumps(TestDataFactory.user_create_data({"email": "invalid-email"})),
+                     422, id="invalid-email"),
+        pytest.param(orjson.dumps(TestDataFactory.user_create_data({"password": "123"})), 422,
+                     id="weak-password"),
+        pytest.param(orjson.dumps(TestDataFactory.user_create_data({"role": "invalid_role"})),
+                     422, id="invalid-role"),
+    ])
+    async def test_create_user_validation(
+        self, async_client: AsyncClient, admin_headers, user_data, expected_status
+    ):
+        """Test user creation with invalid payloads."""
+        response = await async_client.post(
+            "/api/v1/users/", content=user_data, headers={**admin_headers, **_JSON_CONTENT_TYPE}
+        )
+        
+        assert response.status_code == expected_status
     
-    def test_update_user_invalid_email_format(self, client: TestClient, admin_headers, test_user):
+    async def test_update_user_invalid_email_format(self, async_client: AsyncClient, admin_headers, test_user):
         """Test updating user with invalid email format."""
         update_data = {
             "email": "invalid-email-format"
         }
         
-        response = client.put(f"/api/v1/users/{test_user.id}", 
-                            json=update_data, 
-                            headers=admin_headers)
-        
-        assert response.status_code == 422
-    
-    def test_create_user_invalid_role(self, client: TestClient, admin_headers):
-        """Test creating user with invalid role."""
-        user_data = TestDataFactory.user_create_data({
-            "role": "invalid_role"
-        })
-        
-        response = client.post("/api/v1/users/", 
-                             json=user_data, 
-                             headers=admin_headers)
+        response = await async_client.put(
+            f"/api/v1/users/{test_user.id}", json=update_data, headers=admin_headers
+        )
         
         assert response.status_code == 422
@@ -3,23 +3,111 @@ Tests for WebSocket handlers and real-time functionality.
 """
 import asyncio
 import json
-from datetime import datetime
+from datetime import datetime, timezone
+from time import perf_counter_ns
 from typing import Dict, Any
-from unittest.mock import Mock, AsyncMock, patch
+from unittest.mock import Mock, AsyncMock, call, patch
 
+import orjson
 import pytest
-from fastapi import WebSocket
+from fastapi import WebSocket, WebSocketDisconnect, status
 from httpx import AsyncClient
 
 from tests.utils.mock_services import MockWebSocketManager
 from tests.utils.test_helpers import AsyncTestHelper
 
+# One timestamp for every event payload; no test here depends on event times
+_TS = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+# Message types a client may send; anything else is rejected
+_VALID_TYPES = frozenset({
+    "ping", "pong", "join_room", "leave_room", "message", "typing_start", "typing_stop"
+})
+
+# Fields shared by the rate-limit test's messages; only "index" varies
+_BASE_MSG = {"type": "test_message", "timestamp": _TS}
+
+# Single events broadcast by test_broadcast_fanout
+_CARD_MOVE_EVENT = {
+    "type": "card_moved",
+    "card_id": "card_456",
+    "from_column": "todo",
+    "to_column": "in_progress",
+    "from_position": 2,
+    "to_position": 0,
+    "moved_by": "user_123",
+    "timestamp": _TS
+}
+
+_CHAT_MESSAGE_EVENT = {
+    "type": "message",
+    "message_id": "msg_123",
+    "user_id": "user_123",
+    "user_name": "John Doe",
+    "content": "Hello everyone!",
+    "timestamp": _TS,
+    "room_id": "general"
+}
+
+_ANNOUNCEMENT_EVENT = {
+    "type": "system_announcement",
+    "message": "Performance test message",
+    "timestamp": _TS
+}
+
+
+class _StubWS:
+    """Attribute-free websocket stand-in for tests that never send on it.
+
+    Hashes by identity like any object, so the manager can keep it in a set.
+    """
+    __slots__ = ()
+
+
+@pytest.fixture(scope="module")
+def websocket_mocks():
+    """Mock websockets shared by the module; connected_mocks hands out a prefix."""
+    websockets = []
+    for _ in range(100):
+        mock_websocket = Mock(spec=WebSocket, send_bytes=AsyncMock())
+        websockets.append(mock_websocket)
+    return websockets
+
+
+@pytest.fixture(scope="class")
+def shared_websocket_manager():
+    """One manager per test class, like the app's singleton connection manager."""
+    return MockWebSocketManager()
+
+
+@pytest.fixture
+def websocket_manager(shared_websocket_manager):
+    """The class's manager, reset after each test."""
+    yield shared_websocket_manager
+    shared_websocket_manager.reset()
+
+
+@pytest.fixture
+async def connected_mocks(request, websocket_manager, websocket_mocks):
+    """The manager with n mock websockets connected, parametrized as (n, channel).
+
+    A channel containing "{i}" is formatted per websocket, giving each one
+    its own channel. The mocks are reset afterwards for the next test.
+    """
+    n, channel = request.param
+    websockets = websocket_mocks[:n]
+    for i, mock_websocket in enumerate(websockets):
+        await websocket_manager.connect(mock_websocket, channel.format(i=i))
+    yield websocket_manager, websockets
+    for mock_websocket in websockets:
+        mock_websocket.reset_mock()
+
 
 @pytest.mark.websocket
 class TestWebSocketNotifications:
     """Test WebSocket notification handlers."""
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_notification_websocket_connection(self, async_client: AsyncClient, auth_token):
         """Test WebSocket connection for notifications."""
         try:
@@ -28,7 +116,7 @@ class TestWebSocketNotifications:
                 assert websocket is not None
                 
                 # Send ping message
-                await websocket.send_json({"type": "ping", "timestamp": datetime.utcnow().isoformat()})
+                await websocket.send_json({"type": "ping", "timestamp": _TS})
                 
                 # Receive pong response
                 response = await websocket.receive_json()
@@ -37,12 +125,12 @@ class TestWebSocketNotifications:
         except Exception as e:
             pytest.skip(f"WebSocket test skipped due to: {e}")
     
-    @pytest.mark.asyncio
-    async def test_notification_broadcast(self, async_client: AsyncClient, auth_token):
+    @pytest.mark.anyio
+    async def test_notification_broadcast(
+        self, async_client: AsyncClient, auth_token, websocket_manager
+    ):
         """Test notification broadcasting to connected users."""
-        websocket_manager = MockWebSocketManager()
-        mock_websocket = Mock()
-        mock_websocket.send_json = AsyncMock()
+        mock_websocket = Mock(spec=WebSocket, send_bytes=AsyncMock())
         
         # Simulate connection
         await websocket_manager.connect(mock_websocket, "user_123")
@@ -57,29 +145,26 @@ class TestWebSocketNotifications:
                 "title": "Software Development Project",
                 "deadline": "2024-12-31T23:59:59Z"
             },
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": _TS
         }
         
         await websocket_manager.send_to_user("123", notification_data)
         
         # Verify message was sent
-        mock_websocket.send_json.assert_called_once_with(notification_data)
+        mock_websocket.send_bytes.assert_called_once_with(orjson.dumps(notification_data))
         
         # Verify message was stored
         messages = websocket_manager.get_messages_for_channel("user_123")
         assert len(messages) == 1
         assert messages[0]["type"] == "tender_created"
     
-    @pytest.mark.asyncio
-    async def test_multiple_user_notifications(self):
+    @pytest.mark.anyio
+    async def test_multiple_user_notifications(self, websocket_manager):
         """Test notifications to multiple connected users."""
-        websocket_manager = MockWebSocketManager()
-        
         # Create mock websockets for multiple users
         user_websockets = {}
         for user_id in ["user_1", "user_2", "user_3"]:
-            mock_websocket = Mock()
-            mock_websocket.send_json = AsyncMock()
+            mock_websocket = Mock(spec=WebSocket, send_bytes=AsyncMock())
             user_websockets[user_id] = mock_websocket
             await websocket_manager.connect(mock_websocket, user_id)
         
@@ -88,43 +173,57 @@ class TestWebSocketNotifications:
             "type": "system_announcement",
             "title": "System Maintenance",
             "message": "Scheduled maintenance tonight at 2 AM",
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": _TS
         }
         
-        # Send to each user
-        for user_id in user_websockets:
-            await websocket_manager.send_to_user(user_id.replace("user_", ""), notification)
+        # Send to every user concurrently
+        await asyncio.gather(*(
+            websocket_manager.send_to_user(user_id.removeprefix("user_"), notification)
+            for user_id in user_websockets
+        ))
         
         # Verify all users received the notification
-        for user_id, websocket in user_websockets.items():
-            websocket.send_json.assert_called_with(notification)
+        expected = call(orjson.dumps(notification))
+        for websocket in user_websockets.values():
+            assert websocket.send_bytes.await_args == expected
+    
+    @pytest.mark.anyio
+    @pytest.mark.parametrize("connected_mocks", [(1, "user_123")], indirect=True)
+    async def test_notification_without_timestamp_is_stamped(self, connected_mocks):
+        """Test that events sent without a timestamp get one."""
+        websocket_manager, (mock_websocket,) = connected_mocks
+        
+        await websocket_manager.send_to_user("123", {"type": "ping"})
+        
+        sent = orjson.loads(mock_websocket.send_bytes.call_args.args[0])
+        assert sent["type"] == "ping"
+        assert sent["timestamp"]
+        assert websocket_manager.get_messages_for_channel("user_123") == [sent]
     
-    @pytest.mark.asyncio
-    async def test_websocket_disconnection_handling(self):
+    @pytest.mark.anyio
+    async def test_websocket_disconnection_handling(self, websocket_manager):
         """Test proper handling of WebSocket disconnections."""
-        websocket_manager = MockWebSocketManager()
-        mock_websocket = Mock()
-        mock_websocket.send_json = AsyncMock()
+        mock_websocket = Mock(spec=WebSocket, send_bytes=AsyncMock())
         
         # Connect and then disconnect
         await websocket_manager.connect(mock_websocket, "user_123")
         assert "user_123" in websocket_manager.connections
         
         websocket_manager.disconnect(mock_websocket, "user_123")
-        assert len(websocket_manager.connections.get("user_123", [])) == 0
+        assert "user_123" not in websocket_manager.connections
         
         # Try to send message to disconnected user
         await websocket_manager.send_to_user("123", {"type": "test"})
         
         # Should not raise error, but message should not be delivered
-        mock_websocket.send_json.assert_not_called()
+        mock_websocket.send_bytes.assert_not_called()
 
 
 @pytest.mark.websocket
 class TestWebSocketKanban:
     """Test WebSocket handlers for Kanban real-time collaboration."""
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_kanban_websocket_connection(self, async_client: AsyncClient, auth_token):
         """Test WebSocket connection for Kanban board."""
         board_id = "test-board-123"
@@ -148,52 +247,13 @@ class TestWebSocketKanban:
         except Exception as e:
             pytest.skip(f"Kanban WebSocket test skipped due to: {e}")
     
-    @pytest.mark.asyncio
-    async def test_card_drag_and_drop_sync(self):
-        """Test real-time synchronization of card drag and drop."""
-        websocket_manager = MockWebSocketManager()
-        board_channel = "kanban_board_123"
-        
-        # Create mock websockets for multiple users
-        user_websockets = []
-        for i in range(3):
-            mock_websocket = Mock()
-            mock_websocket.send_json = AsyncMock()
-            user_websockets.append(mock_websocket)
-            await websocket_manager.connect(mock_websocket, board_channel)
-        
-        # Simulate card move operation
-        card_move_data = {
-            "type": "card_moved",
-            "card_id": "card_456",
-            "from_column": "todo",
-            "to_column": "in_progress",
-            "from_position": 2,
-            "to_position": 0,
-            "moved_by": "user_123",
-            "timestamp": datetime.utcnow().isoformat()
-        }
-        
-        await websocket_manager.broadcast_to_channel(board_channel, card_move_data)
-        
-        # Verify all connected users received the update
-        for websocket in user_websockets:
-            websocket.send_json.assert_called_with(card_move_data)
-    
-    @pytest.mark.asyncio
-    async def test_collaborative_editing_sync(self):
+    @pytest.mark.anyio
+    @pytest.mark.parametrize("connected_mocks", [(2, "kanban_board_123")], indirect=True)
+    async def test_collaborative_editing_sync(self, connected_mocks):
         """Test real-time synchronization of card editing."""
-        websocket_manager = MockWebSocketManager()
+        websocket_manager, user_websockets = connected_mocks
         board_channel = "kanban_board_123"
         
-        # Setup multiple users
-        user_websockets = []
-        for i in range(2):
-            mock_websocket = Mock()
-            mock_websocket.send_json = AsyncMock()
-            user_websockets.append(mock_websocket)
-            await websocket_manager.connect(mock_websocket, board_channel)
-        
         # Simulate collaborative editing events
         editing_events = [
             {
@@ -201,7 +261,7 @@ class TestWebSocketKanban:
                 "card_id": "card_789",
                 "user_id": "user_123",
                 "user_name": "John Doe",
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": _TS
             },
             {
                 "type": "card_content_changed",
@@ -209,62 +269,56 @@ class TestWebSocketKanban:
                 "field": "title",
                 "new_value": "Updated Card Title",
                 "user_id": "user_123",
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": _TS
             },
             {
                 "type": "card_editing_finished",
                 "card_id": "card_789",
                 "user_id": "user_123",
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": _TS
             }
         ]
         
-        # Broadcast each event
-        for event in editing_events:
-            await websocket_manager.broadcast_to_channel(board_channel, event)
+        # Broadcast the events as one batch
+        await websocket_manager.broadcast_batch(board_channel, editing_events)
         
-        # Verify all events were sent to all users
+        # Verify every user got all events in a single frame
+        batch = orjson.dumps({"type": "multi", "payload": editing_events})
         for websocket in user_websockets:
-            assert websocket.send_json.call_count == len(editing_events)
+            websocket.send_bytes.assert_called_once_with(batch)
     
-    @pytest.mark.asyncio
-    async def test_user_presence_tracking(self):
+    @pytest.mark.anyio
+    @pytest.mark.parametrize("connected_mocks", [(1, "kanban_board_123")], indirect=True)
+    async def test_user_presence_tracking(self, connected_mocks):
         """Test tracking of active users on Kanban board."""
-        websocket_manager = MockWebSocketManager()
-        board_channel = "kanban_board_123"
-        
         # Simulate user joining
-        mock_websocket1 = Mock()
-        mock_websocket1.send_json = AsyncMock()
-        await websocket_manager.connect(mock_websocket1, board_channel)
+        websocket_manager, (mock_websocket1,) = connected_mocks
+        board_channel = "kanban_board_123"
         
         user_joined_event = {
             "type": "user_joined",
             "user_id": "user_123",
             "user_name": "John Doe",
             "avatar_url": "https://example.com/avatar.jpg",
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": _TS
         }
         
         await websocket_manager.broadcast_to_channel(board_channel, user_joined_event)
         
         # Simulate another user joining
-        mock_websocket2 = Mock()
-        mock_websocket2.send_json = AsyncMock()
+        mock_websocket2 = Mock(spec=WebSocket, send_bytes=AsyncMock())
         await websocket_manager.connect(mock_websocket2, board_channel)
         
         # Both should receive presence updates
         for websocket in [mock_websocket1, mock_websocket2]:
-            websocket.send_json.assert_called()
+            websocket.send_bytes.assert_called()
     
-    @pytest.mark.asyncio
-    async def test_conflict_resolution(self):
+    @pytest.mark.anyio
+    async def test_conflict_resolution(self, websocket_manager):
         """Test conflict resolution in collaborative editing."""
-        websocket_manager = MockWebSocketManager()
         board_channel = "kanban_board_123"
         
-        mock_websocket = Mock()
-        mock_websocket.send_json = AsyncMock()
+        mock_websocket = Mock(spec=WebSocket, send_bytes=AsyncMock())
         await websocket_manager.connect(mock_websocket, board_channel)
         
         # Simulate conflict scenario
@@ -279,19 +333,19 @@ class TestWebSocketKanban:
                 "field": "description",
                 "value": "Final description"
             },
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": _TS
         }
         
         await websocket_manager.broadcast_to_channel(board_channel, conflict_event)
         
-        mock_websocket.send_json.assert_called_with(conflict_event)
+        mock_websocket.send_bytes.assert_called_with(orjson.dumps(conflict_event))
 
 
 @pytest.mark.websocket
 class TestWebSocketChat:
     """Test WebSocket handlers for chat functionality."""
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_chat_websocket_connection(self, async_client: AsyncClient, auth_token):
         """Test WebSocket connection for chat."""
         room_id = "general"
@@ -315,51 +369,13 @@ class TestWebSocketChat:
         except Exception as e:
             pytest.skip(f"Chat WebSocket test skipped due to: {e}")
     
-    @pytest.mark.asyncio
-    async def test_chat_message_broadcasting(self):
-        """Test broadcasting of chat messages."""
-        websocket_manager = MockWebSocketManager()
-        room_channel = "chat_room_general"
-        
-        # Setup multiple users in chat room
-        user_websockets = []
-        for i in range(3):
-            mock_websocket = Mock()
-            mock_websocket.send_json = AsyncMock()
-            user_websockets.append(mock_websocket)
-            await websocket_manager.connect(mock_websocket, room_channel)
-        
-        # Send chat message
-        chat_message = {
-            "type": "message",
-            "message_id": "msg_123",
-            "user_id": "user_123",
-            "user_name": "John Doe",
-            "content": "Hello everyone!",
-            "timestamp": datetime.utcnow().isoformat(),
-            "room_id": "general"
-        }
-        
-        await websocket_manager.broadcast_to_channel(room_channel, chat_message)
-        
-        # Verify all users received the message
-        for websocket in user_websockets:
-            websocket.send_json.assert_called_with(chat_message)
-    
-    @pytest.mark.asyncio
-    async def test_typing_indicators(self):
+    @pytest.mark.anyio
+    @pytest.mark.parametrize("connected_mocks", [(2, "chat_room_general")], indirect=True)
+    async def test_typing_indicators(self, connected_mocks):
         """Test typing indicator functionality."""
-        websocket_manager = MockWebSocketManager()
+        websocket_manager, user_websockets = connected_mocks
         room_channel = "chat_room_general"
         
-        # Setup users
-        user_websockets = []
-        for i in range(2):
-            mock_websocket = Mock()
-            mock_websocket.send_json = AsyncMock()
-            user_websockets.append(mock_websocket)
-            await websocket_manager.connect(mock_websocket, room_channel)
-        
         # Simulate typing events
         typing_events = [
             {
@@ -367,32 +383,30 @@ class TestWebSocketChat:
                 "user_id": "user_123",
                 "user_name": "John Doe",
                 "room_id": "general",
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": _TS
             },
             {
                 "type": "typing_stop",
                 "user_id": "user_123",
                 "user_name": "John Doe",
                 "room_id": "general",
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": _TS
             }
         ]
         
-        for event in typing_events:
-            await websocket_manager.broadcast_to_channel(room_channel, event)
+        await websocket_manager.broadcast_batch(room_channel, typing_events)
         
-        # Verify typing indicators were broadcast
+        # Verify typing indicators were broadcast in a single frame
+        batch = orjson.dumps({"type": "multi", "payload": typing_events})
         for websocket in user_websockets:
-            assert websocket.send_json.call_count == len(typing_events)
+            websocket.send_bytes.assert_called_once_with(batch)
     
-    @pytest.mark.asyncio
-    async def test_file_sharing_in_chat(self):
+    @pytest.mark.anyio
+    async def test_file_sharing_in_chat(self, websocket_manager):
         """Test file sharing functionality in chat."""
-        websocket_manager = MockWebSocketManager()
         room_channel = "chat_room_general"
         
-        mock_websocket = Mock()
-        mock_websocket.send_json = AsyncMock()
+        mock_websocket = Mock(spec=WebSocket, send_bytes=AsyncMock())
         await websocket_manager.connect(mock_websocket, room_channel)
         
         # Simulate file share event
@@ -409,21 +423,19 @@ class TestWebSocketChat:
                 "download_url": "https://example.com/download/file_789"
             },
             "room_id": "general",
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": _TS
         }
         
         await websocket_manager.broadcast_to_channel(room_channel, file_share_event)
         
-        mock_websocket.send_json.assert_called_with(file_share_event)
+        mock_websocket.send_bytes.assert_called_with(orjson.dumps(file_share_event))
     
-    @pytest.mark.asyncio
-    async def test_message_reactions(self):
+    @pytest.mark.anyio
+    async def test_message_reactions(self, websocket_manager):
         """Test message reaction functionality."""
-        websocket_manager = MockWebSocketManager()
         room_channel = "chat_room_general"
         
-        mock_websocket = Mock()
-        mock_websocket.send_json = AsyncMock()
+        mock_websocket = Mock(spec=WebSocket, send_bytes=AsyncMock())
         await websocket_manager.connect(mock_websocket, room_channel)
         
         # Simulate reaction events
@@ -433,121 +445,223 @@ class TestWebSocketChat:
                 "message_id": "msg_123",
                 "user_id": "user_456",
                 "reaction": "👍",
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": _TS
             },
             {
                 "type": "reaction_removed",
                 "message_id": "msg_123",
                 "user_id": "user_456",
                 "reaction": "👍",
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": _TS
             }
         ]
         
-        for event in reaction_events:
-            await websocket_manager.broadcast_to_channel(room_channel, event)
+        await asyncio.gather(*(
+            websocket_manager.broadcast_to_channel(room_channel, event)
+            for event in reaction_events
+        ))
         
-        # Verify reactions were broadcast
-        assert mock_websocket.send_json.call_count == len(reaction_events)
+        # Verify reactions were broadcast; concurrent sends may arrive in any order
+        sent_types = {
+            orjson.loads(call.args[0])["type"] for call in mock_websocket.send_bytes.call_args_list
+        }
+        assert mock_websocket.send_bytes.call_count == len(reaction_events)
+        assert sent_types == {event["type"] for event in reaction_events}
 
 
 @pytest.mark.websocket
 class TestWebSocketPerformance:
     """Test WebSocket performance and scalability."""
     
-    @pytest.mark.asyncio
-    async def test_multiple_concurrent_connections(self):
+    @pytest.mark.anyio
+    @pytest.mark.parametrize("connected_mocks,channel,event", [
+        pytest.param((1, "kanban_board_123"), "kanban_board_123", _CARD_MOVE_EVENT, id="smoke"),
+        pytest.param((3, "kanban_board_123"), "kanban_board_123", _CARD_MOVE_EVENT,
+                     id="card_moved"),
+        pytest.param((3, "chat_room_general"), "chat_room_general", _CHAT_MESSAGE_EVENT,
+                     id="message"),
+        pytest.param((100, "announcements"), "announcements", _ANNOUNCEMENT_EVENT,
+                     id="system_announcement"),
+    ], indirect=["connected_mocks"])
+    async def test_broadcast_fanout(self, connected_mocks, channel, event):
+        """Test that a channel broadcast reaches every connected user."""
+        websocket_manager, user_websockets = connected_mocks
+        
+        await websocket_manager.broadcast_to_channel(channel, event)
+        
+        payload = orjson.dumps(event)
+        for websocket in user_websockets:
+            websocket.send_bytes.assert_called_once_with(payload)
+    
+    @pytest.mark.anyio
+    @pytest.mark.parametrize("connected_mocks", [(100, "user_{i}")], indirect=True)
+    async def test_multiple_concurrent_connections(self, connected_mocks):
         """Test handling multiple concurrent WebSocket connections."""
-        websocket_manager = MockWebSocketManager()
-        
-        # Create many concurrent connections
-        connections = []
-        for i in range(100):
-            mock_websocket = Mock()
-            mock_websocket.send_json = AsyncMock()
-            connections.append(mock_websocket)
-            await websocket_manager.connect(mock_websocket, f"user_{i}")
+        # Many concurrent connections, one user channel each
+        websocket_manager, connections = connected_mocks
         
         # Broadcast message to all
-        broadcast_message = {
-            "type": "system_announcement",
-            "message": "Performance test message",
-            "timestamp": datetime.utcnow().isoformat()
-        }
+        broadcast_message = _ANNOUNCEMENT_EVENT
+        
+        # Fan out concurrently, capped the way a production broadcast would be
+        semaphore = asyncio.Semaphore(100)
+        
+        async def safe_send(i):
+            async with semaphore:
+                await websocket_manager.send_to_user(str(i), broadcast_message)
         
         # Measure broadcast time
-        start_time = datetime.utcnow()
+        start = perf_counter_ns()
+        
+        results = await asyncio.gather(
+            *(safe_send(i) for i in range(100)), return_exceptions=True
+        )
         
-        # Send to all users
-        for i in range(100):
-            await websocket_manager.send_to_user(str(i), broadcast_message)
+        broadcast_time = (perf_counter_ns() - start) / 1e9
         
-        end_time = datetime.utcnow()
-        broadcast_time = (end_time - start_time).total_seconds()
+        assert not [r for r in results if isinstance(r, BaseException)]
         
         # Should complete reasonably quickly
         assert broadcast_time < 1.0, f"Broadcast took too long: {broadcast_time}s"
         
         # Verify all connections received the message
         for websocket in connections:
-            websocket.send_json.assert_called_with(broadcast_message)
+            websocket.send_bytes.assert_called_with(orjson.dumps(broadcast_message))
     
-    @pytest.mark.asyncio
-    async def test_message_rate_limiting(self):
-        """Test message rate limiting for WebSocket connections."""
-        websocket_manager = MockWebSocketManager()
+    @pytest.mark.anyio
+    async def test_channel_sharding_reduces_fanout(self, websocket_manager):
+        """Test that topic subscriptions keep events from uninterested connections."""
+        events_channel = "events"
+        
+        alert_websockets = [Mock(spec=WebSocket, send_bytes=AsyncMock()) for _ in range(50)]
+        chat_websockets = [Mock(spec=WebSocket, send_bytes=AsyncMock()) for _ in range(50)]
+        for websocket in alert_websockets:
+            await websocket_manager.connect(websocket, events_channel, topics={"alerts"})
+        for websocket in chat_websockets:
+            await websocket_manager.connect(websocket, events_channel, topics={"chat"})
+        
+        alert = {"type": "alert", "message": "Tender deadline in one hour", "timestamp": _TS}
+        await websocket_manager.broadcast_to_channel(events_channel, alert, event_type="alerts")
+        
+        for websocket in alert_websockets:
+            websocket.send_bytes.assert_awaited_once_with(orjson.dumps(alert))
+        for websocket in chat_websockets:
+            websocket.send_bytes.assert_not_awaited()
+    
+    @pytest.mark.anyio
+    @pytest.mark.parametrize("connected_mocks", [(1, "kanban_board_123")], indirect=True)
+    async def test_batch_split_at_size_cap(self, connected_mocks):
+        """Test that batches over the frame size cap go out as several envelopes."""
+        websocket_manager, (mock_websocket,) = connected_mocks
+        
+        # Each event is ~40 KiB, so no two fit in one 64 KiB envelope
+        events = [
+            {"type": "card_content_changed", "index": i, "new_value": "x" * 40 * 1024, "timestamp": _TS}
+            for i in range(3)
+        ]
+        await websocket_manager.broadcast_batch("kanban_board_123", events)
         
+        frames = [call.args[0] for call in mock_websocket.send_bytes.call_args_list]
+        assert len(frames) == len(events)
+        assert all(len(frame) <= MockWebSocketManager.MAX_BATCH_BYTES for frame in frames)
+        assert [orjson.loads(frame)["payload"] for frame in frames] == [[e] for e in events]
+    
+    @pytest.mark.anyio
+    @pytest.mark.parametrize("connected_mocks", [(1, "kanban_board_123")], indirect=True)
+    async def test_batch_oversized_event_sent_alone(self, connected_mocks):
+        """Test that an event over the frame size cap gets a frame to itself."""
+        websocket_manager, (mock_websocket,) = connected_mocks
+        
+        events = [
+            {"type": "card_moved", "index": 0, "timestamp": _TS},
+            {"type": "card_content_changed", "index": 1, "new_value": "x" * 70_000, "timestamp": _TS},
+            {"type": "card_moved", "index": 2, "timestamp": _TS},
+        ]
+        await websocket_manager.broadcast_batch("kanban_board_123", events)
+        
+        frames = [call.args[0] for call in mock_websocket.send_bytes.call_args_list]
+        assert [orjson.loads(frame)["payload"] for frame in frames] == [[e] for e in events]
+        # Only the frame holding the oversized event goes over the cap
+        assert [len(frame) > MockWebSocketManager.MAX_BATCH_BYTES for frame in frames] == [False, True, False]
+    
+    @pytest.mark.anyio
+    async def test_batch_respects_topics_and_stamps_events(self, websocket_manager):
+        """Test that batched events are filtered by topic and timestamped like single ones."""
+        events_channel = "events"
+        
+        alert_websocket = Mock(spec=WebSocket, send_bytes=AsyncMock())
+        chat_websocket = Mock(spec=WebSocket, send_bytes=AsyncMock())
+        await websocket_manager.connect(alert_websocket, events_channel, topics={"alert"})
+        await websocket_manager.connect(chat_websocket, events_channel, topics={"chat"})
+        
+        events = [
+            {"type": "alert", "message": "Tender deadline in one hour"},
+            {"type": "chat", "message": "On it", "timestamp": _TS},
+        ]
+        await websocket_manager.broadcast_batch(events_channel, events)
+        
+        alert_frame = orjson.loads(alert_websocket.send_bytes.call_args.args[0])
+        assert [event["type"] for event in alert_frame["payload"]] == ["alert"]
+        assert alert_frame["payload"][0]["timestamp"]
+        
+        chat_websocket.send_bytes.assert_awaited_once_with(
+            orjson.dumps({"type": "multi", "payload": [events[1]]})
+        )
+    
+    @pytest.mark.anyio
+    @pytest.mark.parametrize("n", [10, 100, 1000])
+    async def test_message_rate_limiting(self, websocket_manager, n):
+        """Test message rate limiting for WebSocket connections."""
         # This would test rate limiting implementation
         # For now, we'll test the concept
         
-        mock_websocket = Mock()
-        mock_websocket.send_json = AsyncMock()
+        mock_websocket = Mock(spec=WebSocket, send_bytes=AsyncMock())
         await websocket_manager.connect(mock_websocket, "user_123")
         
+        # Serialize up front so the loop only measures sending
+        payloads = tuple(orjson.dumps(_BASE_MSG | {"index": i}) for i in range(n))
+        
         # Send many messages quickly
-        for i in range(100):
-            message = {
-                "type": "test_message",
-                "index": i,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-            await websocket_manager.send_to_user("123", message)
+        for payload in payloads:
+            await websocket_manager.send_to_user_prepared("123", payload)
         
         # In a real implementation, rate limiting would prevent some messages
         # For this mock, all messages are sent
-        assert len(websocket_manager.get_messages_for_channel("user_123")) == 100
+        assert len(websocket_manager.get_messages_for_channel("user_123")) == n
     
-    @pytest.mark.asyncio
-    async def test_websocket_memory_usage(self):
+    @pytest.mark.anyio
+    async def test_websocket_memory_usage(self, websocket_manager):
         """Test WebSocket memory usage with many connections."""
-        websocket_manager = MockWebSocketManager()
-        
         # Create many connections
         initial_connections = len(websocket_manager.connections)
         
-        for i in range(1000):
-            mock_websocket = Mock()
-            await websocket_manager.connect(mock_websocket, f"user_{i}")
+        mocks = [_StubWS() for _ in range(1000)]
+        
+        # Connect concurrently, at most 128 at a time
+        for start in range(0, len(mocks), 128):
+            await asyncio.gather(*(
+                websocket_manager.connect(mock_websocket, f"user_{i}")
+                for i, mock_websocket in enumerate(mocks[start:start + 128], start)
+            ))
         
         # Verify connections are tracked
         assert len(websocket_manager.connections) == 1000
         
-        # Disconnect all
-        for i in range(1000):
-            user_connections = websocket_manager.connections.get(f"user_{i}", [])
-            for websocket in user_connections:
-                websocket_manager.disconnect(websocket, f"user_{i}")
+        # Disconnect all; disconnect is synchronous
+        for i, mock_websocket in enumerate(mocks):
+            websocket_manager.disconnect(mock_websocket, f"user_{i}")
         
-        # Verify cleanup
+        # Verify cleanup, including the emptied per-user entries
         active_connections = sum(len(conns) for conns in websocket_manager.connections.values())
         assert active_connections == 0
+        assert not websocket_manager.connections
 
 
 @pytest.mark.websocket
 class TestWebSocketSecurity:
     """Test WebSocket security and authentication."""
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_websocket_authentication_required(self, async_client: AsyncClient):
         """Test that WebSocket connections require valid authentication."""
         invalid_token = "invalid.token.here"
@@ -560,7 +674,7 @@ class TestWebSocketSecurity:
             # Expected to fail
             pass
     
-    @pytest.mark.asyncio
+    @pytest.mark.anyio
     async def test_websocket_authorization_by_resource(self, async_client: AsyncClient, auth_token):
         """Test WebSocket authorization for specific resources."""
         # Test access to Kanban board that user shouldn't have access to
@@ -578,15 +692,13 @@ class TestWebSocketSecurity:
                 response = await asyncio.wait_for(websocket.receive_json(), timeout=1.0)
                 assert response.get("type") == "access_denied"
                 
-        except Exception as e:
-            # Expected for unauthorized access
-            assert "access" in str(e).lower() or "unauthorized" in str(e).lower()
+        except WebSocketDisconnect as e:
+            # The Kanban handler closes with a policy violation on denied access
+            assert e.code == status.WS_1008_POLICY_VIOLATION
     
-    @pytest.mark.asyncio
-    async def test_websocket_message_validation(self):
+    @pytest.mark.anyio
+    async def test_websocket_message_validation(self, websocket_manager):
         """Test validation of WebSocket messages."""
-        websocket_manager = MockWebSocketManager()
-        
         # Test with various invalid message formats
         invalid_messages = [
             None,
@@ -599,26 +711,21 @@ class TestWebSocketSecurity:
         
         # In a real implementation, these would be validated
         # For now, we'll simulate the validation logic
-        valid_types = ["ping", "pong", "join_room", "leave_room", "message", "typing_start", "typing_stop"]
-        
         for message in invalid_messages:
-            if isinstance(message, dict) and message.get("type") not in valid_types:
+            if isinstance(message, dict) and message.get("type") not in _VALID_TYPES:
                 # This would be rejected in real implementation
-                assert message.get("type") not in valid_types
+                assert message.get("type") not in _VALID_TYPES
     
-    @pytest.mark.asyncio
-    async def test_websocket_connection_limits(self):
+    @pytest.mark.anyio
+    async def test_websocket_connection_limits(self, websocket_manager):
         """Test WebSocket connection limits per user."""
-        websocket_manager = MockWebSocketManager()
-        
         # Simulate connection limit (e.g., max 5 connections per user)
         max_connections = 5
         user_id = "user_123"
         
         connections = []
         for i in range(max_connections + 2):  # Try to exceed limit
-            mock_websocket = Mock()
-            mock_websocket.send_json = AsyncMock()
+            mock_websocket = Mock(spec=WebSocket, send_bytes=AsyncMock())
             
             # In real implementation, this would enforce limits
             if len(websocket_manager.connections.get(user_id, [])) < max_connections:
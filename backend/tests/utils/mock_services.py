@@ -2,10 +2,13 @@
 Mock implementations for external services used in testing.
 """
 import asyncio
+import time
+from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, DefaultDict, Dict, FrozenSet, List, Optional, Set, Tuple, Union
 from unittest.mock import AsyncMock, Mock
 
+import orjson
 import pytest
 
 
@@ -669,3 +672,147 @@ class MockCalendarService:
     def set_failure_mode(self, should_fail: bool = True):
         """Configure failure behavior."""
         self.should_fail = should_fail
+
+
+class MockWebSocketManager:
+    """Mock WebSocket manager for testing real-time features."""
+    
+    # Largest "multi" envelope broadcast_batch sends as one frame
+    MAX_BATCH_BYTES = 64 * 1024
+    _MULTI_PREFIX = b'{"type":"multi","payload":['
+    _MULTI_SUFFIX = b"]}"
+    # Timestamps stamped onto events are recomputed at most once per 100ms
+    _TIMESTAMP_TICK_NS = 100_000_000
+    
+    def __init__(self):
+        self.connections: DefaultDict[str, Set[Mock]] = defaultdict(set)
+        self.topics: Dict[Mock, Set[str]] = {}
+        self.messages: List[Dict[str, Any]] = []
+        self._ts_cache = (0, "")
+    
+    def _now_iso(self) -> str:
+        """Current time in ISO format, shared by every event in the same tick."""
+        tick = time.monotonic_ns() // self._TIMESTAMP_TICK_NS
+        if tick != self._ts_cache[0]:
+            self._ts_cache = (tick, datetime.utcnow().isoformat())
+        return self._ts_cache[1]
+    
+    async def connect(self, websocket: Mock, channel: str, topics: Optional[Set[str]] = None):
+        """Mock WebSocket connection, optionally subscribed to some event types only."""
+        self.connections[channel].add(websocket)
+        if topics is not None:
+            self.topics[websocket] = topics
+    
+    def disconnect(self, websocket: Mock, channel: str):
+        """Mock WebSocket disconnection."""
+        channel_connections = self.connections.get(channel)
+        if channel_connections is not None:
+            channel_connections.discard(websocket)
+            # Drop emptied channels so they do not pile up
+            if not channel_connections:
+                del self.connections[channel]
+        self.topics.pop(websocket, None)
+    
+    async def broadcast_to_channel(
+        self, channel: str, message: Dict[str, Any], event_type: Optional[str] = None
+    ):
+        """Mock broadcast message to channel, serialized once for all receivers.
+        
+        With an event_type, connections subscribed to other topics are skipped.
+        Events without a timestamp get the current one.
+        """
+        if "timestamp" not in message:
+            message = {**message, "timestamp": self._now_iso()}
+        self.messages.append({"channel": channel, "message": message})
+        
+        if channel in self.connections:
+            payload = orjson.dumps(message)
+            for websocket in self.connections[channel]:
+                topics = self.topics.get(websocket)
+                if event_type is not None and topics is not None and event_type not in topics:
+                    continue
+                await websocket.send_bytes(payload)
+    
+    async def broadcast_batch(self, channel: str, events: List[Dict[str, Any]]):
+        """Mock broadcast of several events coalesced into "multi" envelopes.
+        
+        Events keep their order; when one envelope would exceed
+        MAX_BATCH_BYTES the batch is split across several frames. An event
+        too large to fit on its own goes out alone, in an envelope over the
+        cap, rather than being dropped. As in
+        broadcast_to_channel, events without a timestamp get the current one,
+        and a connection subscribed to topics only receives the events whose
+        type it subscribed to.
+        """
+        now = self._now_iso()
+        events = [event if "timestamp" in event else {**event, "timestamp": now} for event in events]
+        encoded = [orjson.dumps(event) for event in events]
+        
+        # Record the whole batch, then frame it once per distinct topic filter
+        for indices, _ in self._batch_frames(encoded, range(len(events))):
+            message = {"type": "multi", "payload": [events[i] for i in indices]}
+            self.messages.append({"channel": channel, "message": message})
+        
+        receivers: Dict[Optional[FrozenSet[str]], List[Mock]] = defaultdict(list)
+        for websocket in self.connections.get(channel, ()):
+            topics = self.topics.get(websocket)
+            receivers[None if topics is None else frozenset(topics)].append(websocket)
+        
+        for topics, websockets in receivers.items():
+            selected = [
+                i for i, event in enumerate(events)
+                if topics is None or event.get("type") in topics
+            ]
+            for _, payload in self._batch_frames(encoded, selected):
+                for websocket in websockets:
+                    await websocket.send_bytes(payload)
+    
+    def _batch_frames(self, encoded: List[bytes], indices) -> List[Tuple[List[int], bytes]]:
+        """Split the selected encoded events into envelopes of at most MAX_BATCH_BYTES.
+        
+        The only larger envelopes hold a single event that is over the cap by itself.
+        """
+        indices = list(indices)
+        overhead = len(self._MULTI_PREFIX) + len(self._MULTI_SUFFIX)
+        frames = []
+        start = 0
+        while start < len(indices):
+            end = start + 1
+            size = overhead + len(encoded[indices[start]])
+            while end < len(indices) and size + 1 + len(encoded[indices[end]]) <= self.MAX_BATCH_BYTES:
+                size += 1 + len(encoded[indices[end]])
+                end += 1
+            
+            chunk = indices[start:end]
+            payload = self._MULTI_PREFIX + b",".join(encoded[i] for i in chunk) + self._MULTI_SUFFIX
+            frames.append((chunk, payload))
+            start = end
+        return frames
+    
+    async def send_to_user(self, user_id: str, message: Dict[str, Any]):
+        """Mock send message to specific user."""
+        await self.broadcast_to_channel(f"user_{user_id}", message)
+    
+    async def send_to_user_prepared(self, user_id: str, payload: bytes):
+        """Mock send of a message already serialized to JSON bytes."""
+        channel = f"user_{user_id}"
+        self.messages.append({"channel": channel, "message": payload})
+        
+        if channel in self.connections:
+            for websocket in self.connections[channel]:
+                await websocket.send_bytes(payload)
+    
+    def get_messages_for_channel(self, channel: str) -> List[Dict[str, Any]]:
+        """Get messages sent to a specific channel."""
+        return [msg["message"] for msg in self.messages if msg["channel"] == channel]
+    
+    def clear_messages(self):
+        """Clear all stored messages."""
+        self.messages.clear()
+    
+    def reset(self):
+        """Drop all connections, subscriptions and stored messages."""
+        self.connections.clear()
+        self.topics.clear()
+        self.messages.clear()
+        self._ts_cache = (0, "")
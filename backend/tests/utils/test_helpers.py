@@ -265,46 +265,6 @@ class FileTestHelper:
             return f.name
 
 
-class MockWebSocketManager:
-    """Mock WebSocket manager for testing real-time features."""
-    
-    def __init__(self):
-        self.connections: Dict[str, List[Mock]] = {}
-        self.messages: List[Dict[str, Any]] = []
-    
-    async def connect(self, websocket: Mock, channel: str):
-        """Mock WebSocket connection."""
-        if channel not in self.connections:
-            self.connections[channel] = []
-        self.connections[channel].append(websocket)
-    
-    def disconnect(self, websocket: Mock, channel: str):
-        """Mock WebSocket disconnection."""
-        if channel in self.connections:
-            if websocket in self.connections[channel]:
-                self.connections[channel].remove(websocket)
-    
-    async def broadcast_to_channel(self, channel: str, message: Dict[str, Any]):
-        """Mock broadcast message to channel."""
-        self.messages.append({"channel": channel, "message": message})
-        
-        if channel in self.connections:
-            for websocket in self.connections[channel]:
-                await websocket.send_json(message)
-    
-    async def send_to_user(self, user_id: str, message: Dict[str, Any]):
-        """Mock send message to specific user."""
-        await self.broadcast_to_channel(f"user_{user_id}", message)
-    
-    def get_messages_for_channel(self, channel: str) -> List[Dict[str, Any]]:
-        """Get messages sent to a specific channel."""
-        return [msg["message"] for msg in self.messages if msg["channel"] == channel]
-    
-    def clear_messages(self):
-        """Clear all stored messages."""
-        self.messages.clear()
-
-
 class AsyncTestHelper:
     """Helper for async testing operations."""
     